@@ -0,0 +1,279 @@
+import os
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import matplotlib.dates as mdates
+import matplotlib.ticker as mticker
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from backend.app.render import get_render_pool
+from backend import telemetry
+
+GRAY_PALETTE = ['#666666', '#888888', '#AAAAAA', '#BBBBBB']
+
+#####################################################################################
+##########################        chart cache        ################################
+#####################################################################################
+
+
+class ChartCache:
+    """Rendered charts keyed by content hash, LRU-evicted once ``max_bytes`` is exceeded."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._charts: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            image = self._charts.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._charts.move_to_end(key)
+            return image
+
+    def put(self, key: str, image: str):
+        with self._lock:
+            if key in self._charts:
+                self.size -= len(self._charts.pop(key))
+            self._charts[key] = image
+            self.size += len(image)
+            while self.size > self.max_bytes and self._charts:
+                _, old = self._charts.popitem(last=False)
+                self.size -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._charts.clear()
+            self.size = 0
+
+
+chart_cache = ChartCache(int(os.getenv("CHART_CACHE_BYTES", str(64 * 1024 * 1024))))
+
+
+def _hash_value(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode())
+        _hash_value(h, value.index.values)
+        for column in value.columns:
+            _hash_value(h, value[column].values)
+    elif isinstance(value, (pd.Series, pd.Index)):
+        _hash_value(h, value.values)
+    elif isinstance(value, (np.ndarray, list, tuple)):
+        array = np.ascontiguousarray(value)
+        if array.dtype == object:
+            h.update(repr(array.tolist()).encode())
+        else:
+            h.update(str(array.dtype).encode())
+            h.update(str(array.shape).encode())
+            h.update(array.tobytes())
+    else:
+        h.update(repr(value).encode())
+
+
+def chart_key(name: str, *args, **kwargs) -> str:
+    h = hashlib.blake2b(name.encode(), digest_size=20)
+    for value in args:
+        _hash_value(h, value)
+    for key in sorted(kwargs):
+        h.update(key.encode())
+        _hash_value(h, kwargs[key])
+    return h.hexdigest()
+
+
+def rendered_chart(draw):
+    """
+    Public chart function for ``draw``: served from ``chart_cache`` when the same
+    series and parameters were rendered before, otherwise drawn on the render pool.
+    """
+
+    def wrapper(*args, **kwargs):
+        key = chart_key(draw.__name__, *args, **kwargs)
+        image = chart_cache.get(key)
+        telemetry.cache_result("chart", image is not None)
+        if image is None:
+            # drawing and PNG/base64 encoding both happen on the render pool
+            with telemetry.stage("render"):
+                image = get_render_pool().render(draw, *args, **kwargs)
+            chart_cache.put(key, image)
+        return image
+
+    wrapper.__name__ = draw.__name__.replace('draw_', 'generate_', 1)
+    wrapper.__doc__ = draw.__doc__
+    return wrapper
+
+#####################################################################################
+##########################          charts           ################################
+#####################################################################################
+
+
+# Charts only use the object-oriented Figure/FigureCanvasAgg API: pyplot keeps
+# global state and is not safe to use from several threads at once.
+
+def _new_figure(figsize=(10, 5)) -> Figure:
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _figure_to_base64(fig: Figure) -> str:
+    buf = BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format='png')
+    buf.seek(0)
+
+    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
+    buf.close()
+    return image_base64
+
+
+def draw_candlestick_base64(ohlc_df: pd.DataFrame) -> str:
+    # Step 1: Convert ms timestamps
+    x = mdates.date2num(pd.to_datetime(ohlc_df['time'], unit='ms'))
+    open_, high, low, close = (ohlc_df[c].to_numpy(dtype=float) for c in ['open', 'high', 'low', 'close'])
+    colors = np.where(close >= open_, 'green', 'red')
+
+    # bodies are 0.4 of the candle spacing (0.4 day on daily candles)
+    half_width = 0.2 * (np.median(np.diff(x)) if len(x) > 1 else 1.0)
+    bottom, top = np.minimum(open_, close), np.maximum(open_, close)
+
+    # Step 2: Plot bodies and wicks as one collection each
+    fig = _new_figure()
+    ax = fig.subplots()
+
+    wicks = np.stack([np.column_stack([x, low]), np.column_stack([x, high])], axis=1)
+    ax.add_collection(LineCollection(wicks, colors=colors, linewidths=1))
+
+    bodies = np.stack([
+        np.column_stack([x - half_width, bottom]),
+        np.column_stack([x - half_width, top]),
+        np.column_stack([x + half_width, top]),
+        np.column_stack([x + half_width, bottom]),
+    ], axis=1)
+    ax.add_collection(PolyCollection(bodies, facecolors=colors, edgecolors=colors))
+    ax.autoscale_view()
+
+    # Step 3: Format X-axis as dates
+    ax.xaxis_date()
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.xaxis.set_major_locator(mticker.MaxNLocator(10))
+    fig.autofmt_xdate()
+
+    ax.set_ylabel('Price')
+
+    # Step 4: Convert to base64
+    return _figure_to_base64(fig)
+
+
+def draw_multiline_chart_base64(price_df: pd.DataFrame) -> str:
+    df = price_df.set_axis(pd.to_datetime(price_df.index, unit='ms'), axis=0)
+
+    fig = _new_figure()
+    ax = fig.subplots()
+
+    for idx, column in enumerate(df.columns):
+        color = GRAY_PALETTE[idx % len(GRAY_PALETTE)]
+        ax.plot(df.index, df[column], label=column, color=color)
+
+    ax.set_ylabel("Price")
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    fig.autofmt_xdate()
+    ax.legend()
+
+    return _figure_to_base64(fig)
+
+
+def draw_price_and_equity_chart_base64(
+    price_df: pd.DataFrame,
+    equity_curve: list[float],
+    equity_timestamps: list[int]
+) -> str:
+    # Token prices
+    df_token = price_df.set_axis(pd.to_datetime(price_df.index, unit='ms'), axis=0)
+
+    # Equity curve (shorter)
+    df_equity = pd.DataFrame({
+        'time': pd.to_datetime(equity_timestamps, unit='ms'),
+        'equity': equity_curve
+    }).set_index('time')
+
+    # Plot
+    fig = _new_figure()
+    ax = fig.subplots()
+
+    # Plot token lines
+    for idx, column in enumerate(df_token.columns):
+        color = GRAY_PALETTE[idx % len(GRAY_PALETTE)]
+        ax.plot(df_token.index, df_token[column], label=column, color=color, linewidth=2)
+
+    # Plot equity curve (may start later)
+    ax.plot(df_equity.index, df_equity['equity'],
+            label='Equity Curve',
+            color='skyblue',
+            linewidth=3)
+
+    # Format chart
+    ax.set_ylabel("Price")
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    fig.autofmt_xdate()
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.3)
+
+    # Export to base64
+    return _figure_to_base64(fig)
+
+
+def draw_sweep_heatmap_base64(results: pd.DataFrame, metric: str) -> str:
+    algorithms = list(dict.fromkeys(results['algorithm']))
+    fig = _new_figure(figsize=(5 * len(algorithms), 4))
+    axes = fig.subplots(1, len(algorithms), squeeze=False)
+
+    for ax, algorithm in zip(axes[0], algorithms):
+        grid = results[results['algorithm'] == algorithm].pivot(index='lookback', columns='rebalance', values=metric)
+        im = ax.imshow(grid.values.astype(float), cmap='viridis', aspect='auto', origin='lower')
+        ax.set_xticks(range(len(grid.columns)), grid.columns)
+        ax.set_yticks(range(len(grid.index)), grid.index)
+        ax.set_xlabel('Rebalance')
+        ax.set_ylabel('Lookback')
+        ax.set_title(f"{algorithm.upper()} - {metric}")
+        fig.colorbar(im, ax=ax)
+
+    return _figure_to_base64(fig)
+
+
+def draw_bootstrap_histogram_base64(paths_df: pd.DataFrame, actual: dict, summary: dict) -> str:
+    metrics = [m for m in paths_df.columns if m in summary]
+    fig = _new_figure(figsize=(5 * len(metrics), 4))
+    axes = fig.subplots(1, len(metrics), squeeze=False)
+
+    for ax, metric in zip(axes[0], metrics):
+        values = paths_df[metric].to_numpy(dtype=float)
+        ax.hist(values[np.isfinite(values)], bins=50, color='skyblue', edgecolor='white')
+        ax.axvspan(summary[metric]['ci_low'], summary[metric]['ci_high'], color=GRAY_PALETTE[0], alpha=0.15, label='CI')
+        if metric in actual:
+            ax.axvline(actual[metric], color='black', linewidth=2, label='Backtest')
+        ax.set_title(metric)
+        ax.legend()
+
+    return _figure_to_base64(fig)
+
+
+generate_candlestick_base64 = rendered_chart(draw_candlestick_base64)
+generate_multiline_chart_base64 = rendered_chart(draw_multiline_chart_base64)
+generate_price_and_equity_chart_base64 = rendered_chart(draw_price_and_equity_chart_base64)
+generate_sweep_heatmap_base64 = rendered_chart(draw_sweep_heatmap_base64)
+generate_bootstrap_histogram_base64 = rendered_chart(draw_bootstrap_histogram_base64)
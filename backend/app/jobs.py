@@ -0,0 +1,230 @@
+"""
+Background jobs for work too long for one HTTP request (hourly or 15-minute
+backtests): a bounded queue drained by a fixed set of worker threads, progress
+reporting, cancellation and deduplication of identical in-flight jobs.
+"""
+import os
+import time
+import uuid
+import queue
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Literal, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "32"))
+# finished jobs kept for polling, oldest dropped first
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "256"))
+
+JobStatus = Literal["queued", "running", "done", "failed", "cancelled"]
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    """
+    One unit of queued work. ``func(job)`` runs on a worker thread and calls
+    ``job.report(done, total)`` as it goes, which raises ``JobCancelled`` once
+    the job was cancelled.
+    """
+
+    def __init__(self, key: tuple, func: Callable[["Job"], Any]):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.func = func
+        self.status: JobStatus = "queued"
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.version = 0
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _changed(self):
+        # called with self._lock held
+        self.version += 1
+        waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def _set(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._changed()
+
+    def report(self, done: int, total: int):
+        if self.cancelled:
+            raise JobCancelled()
+        self._set(done=done, total=total)
+
+    def check(self):
+        """Cancellation point between stages that do not report progress."""
+        if self.cancelled:
+            raise JobCancelled()
+
+    async def wait_for_change(self, version: int, timeout: float) -> int:
+        """Wait (without a thread) until the job moves past ``version``, returns the new version."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.version != version:
+                return self.version
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.version
+
+    def to_dict(self, with_result: bool = True) -> dict:
+        with self._lock:
+            info = {
+                "job_id": self.id,
+                "status": self.status,
+                "done": self.done,
+                "total": self.total,
+                "progress": self.done / self.total if self.total else (1.0 if self.status == "done" else 0.0),
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+            }
+            if self.error is not None:
+                info["error"] = self.error
+            if with_result and self.status == "done":
+                info["result"] = self.result
+            return info
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class JobQueue:
+    """
+    ``workers`` threads draining a queue of at most ``max_queued`` jobs.
+
+    ``submit`` returns the queued or running job with the same key when there
+    is one, and raises ``QueueFull`` instead of queueing without bound.
+    Threads start with the first submission.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED, history: int = JOB_HISTORY):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.history = history
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._in_flight: dict[tuple, Job] = {}
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def _start(self):
+        # called with self._lock held
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key: tuple, func: Callable[[Job], Any]) -> tuple[Job, bool]:
+        """``(job, deduplicated)``"""
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None and not job.cancelled:
+                self.deduplicated += 1
+                return job, True
+            job = Job(key, func)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFull(f"{self.max_queued} jobs already queued, retry later")
+            self._in_flight[key] = job
+            self._jobs[job.id] = job
+            self._prune()
+            self._start()
+            return job, False
+
+    def _prune(self):
+        # called with self._lock held; only finished jobs are dropped
+        excess = len(self._jobs) - self.history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].status in FINISHED:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Queued jobs are dropped when a worker reaches them, running ones stop at their next report."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        job._cancelled.set()
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        if job.status == "queued":
+            job._set(status="cancelled", finished=time.time())
+        return job
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    if self._in_flight.get(job.key) is job:
+                        del self._in_flight[job.key]
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        if job.cancelled:
+            return
+        job._set(status="running", started=time.time())
+        try:
+            result = job.func(job)
+            job.check()
+        except JobCancelled:
+            job._set(status="cancelled", finished=time.time())
+        except Exception as e:
+            job._set(status="failed", error=str(e), finished=time.time())
+        else:
+            job._set(status="done", result=result, finished=time.time())
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "max_queued": self.max_queued,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+        }
@@ -1,34 +1,43 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request, Response, Cookie
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 
 from typing import Literal, List, Optional
 import pandas as pd
 import os
 import json
-import base64
-
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.ticker as mticker
-from matplotlib.patches import Rectangle
-import matplotlib
-matplotlib.use('Agg')
+import uuid
+import sys
+import time
+import threading
 
 from pydantic import BaseModel
-from io import StringIO, BytesIO
-from backend.oneinch.getters import get_token_historical_prices
-from backend.backtest.pfopt import PfOptBacktest, _compute_performance_metrics
-
-from langchain_openai import OpenAI, ChatOpenAI
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.documents import Document
-from langchain_core.runnables import RunnableLambda
-
-app = FastAPI()
+from backend.app.render import get_render_pool
+from backend.oneinch.store import OHLCStore
+from backend.oneinch.symbols import SymbolIndex
+from backend.oneinch.panel import PricePanel, PricePanelCache, align_close_prices
+from backend.backtest.cache import BacktestCache, BacktestResult, price_fingerprint
+from backend.backtest.parallel import DEFAULT_WORKERS
+from backend.app.jobs import Job, JobQueue, QueueFull, FINISHED
+from backend import telemetry
+
+# Charts (matplotlib), the optimizers (pypfopt/cvxpy) and the LLM stack
+# (langchain/openai) are imported on first use, or by warm_up() when
+# WARM_START is set, so that importing this module stays cheap.
+
+WARM_START = os.getenv("WARM_START", "0") == "1"
+MAX_CHART_SYMBOLS = 10
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # on_startup / on_shutdown live in the startup section at the end of this module
+    on_startup()
+    yield
+    on_shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,8 +45,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Partial-Candles", "X-Session-Id"],
 )
 
+if telemetry.TELEMETRY_ENABLED:
+    @app.middleware("http")
+    async def record_request(request: Request, call_next):
+        timings, token = telemetry.begin_request()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            telemetry.end_request(token)
+        # label by route template, not the raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        telemetry.observe("http_request_seconds", time.perf_counter() - start,
+                          {"path": path, "status": response.status_code})
+        if timings:
+            response.headers["Server-Timing"] = telemetry.server_timing(timings)
+        return response
+
 #####################################################################################
 #####################################################################################
 #####################       backtest framework          #############################
@@ -49,165 +77,135 @@ symbol_map_df = pd.read_csv("backend/oneinch/available_symbol.csv")
 symbol_to_addr = dict(zip(symbol_map_df["symbol"], symbol_map_df["address"]))
 
 
-# Optional: still use caching, but include all inputs in the key
-def build_cache_key(symbol: str, period: str, limit: int):
-    return f"{symbol}_{period}_{limit}"
+ohlc_store = OHLCStore()
+job_queue = JobQueue()
+
 
+price_panels = PricePanelCache()
 
-_cached_ohlc_data = {}  # (symbol, period, limit) ➝ JSON string
 
+backtest_cache = BacktestCache()
 
-def get_cached_ohlc(symbol: str, period: str, limit: int) -> str:
-    key = build_cache_key(symbol, period, limit)
-    if key in _cached_ohlc_data:
-        return _cached_ohlc_data[key]
 
+_symbol_index: Optional[SymbolIndex] = None
+_symbol_index_lock = threading.Lock()
+
+
+def get_symbol_index() -> SymbolIndex:
+    global _symbol_index
+    with _symbol_index_lock:
+        if _symbol_index is None:
+            _symbol_index = SymbolIndex.from_files(symbol_df=symbol_map_df)
+        return _symbol_index
+
+
+def _symbol_address(symbol: str) -> str:
     address = symbol_to_addr.get(symbol)
     if not address:
         raise ValueError(f"Symbol {symbol} not found in available_symbol.csv")
+    return address
 
-    df = get_token_historical_prices(address, period=period, limit=limit)
-    json_data = df.to_json(orient="records")
-    _cached_ohlc_data[key] = json_data
-    return json_data
 
-def get_price_df(symbols: str, period: str, limit: int) -> pd.DataFrame:
-    symbol_list = symbols.split(",")
+def get_cached_ohlc(symbol: str, period: str, limit: int) -> pd.DataFrame:
+    return ohlc_store.get(_symbol_address(symbol), period, limit)
 
-    dfs = []
-    for s in symbol_list:
-        json_data = get_cached_ohlc(s, period, limit)
-        df = pd.read_json(StringIO(json_data))
-        df = df[["time", "close"]].rename(columns={"close": s})
-        dfs.append(df)
 
-    df_merged = dfs[0]
-    for df in dfs[1:]:
-        df_merged = df_merged.merge(df, on="time", how="inner")
-    return df_merged
+def partial_candles(symbols: str, period: str) -> dict[str, list[int]]:
+    # start times (ms) of candles rolled up from incomplete finer data, including the running one
+    partial = {}
+    for symbol in symbols.split(","):
+        times = ohlc_store.partial_buckets(_symbol_address(symbol), period)
+        if len(times):
+            partial[symbol] = times.tolist()
+    return partial
+
+
+def _flag_partial_candles(response: Response, symbols: str, period: str):
+    # for endpoints answering with a bare image link: "SYMBOL:count,..."
+    partial = partial_candles(symbols, period)
+    if partial:
+        response.headers["X-Partial-Candles"] = ",".join(f"{s}:{len(t)}" for s, t in partial.items())
+
+
+def get_price_panel(symbols: str, period: str, limit: int, how: Literal["inner", "outer"] = "inner") -> PricePanel:
+    symbol_list = symbols.split(",")
+
+    addresses = [_symbol_address(s) for s in symbol_list]
+    all_columns = ohlc_store.get_many_columns(addresses, period, limit)
+    series = {s: (columns[0], columns[4]) for s, columns in zip(symbol_list, all_columns)}
+
+    # stored candles only change by appending and by rewriting the running (last) candle,
+    # on a refetch or a finer rollup refresh, so (first, last, count, last close) identifies a series version
+    version = tuple((s, t[0], t[-1], len(t), float(c[-1])) if len(t) else (s,) for s, (t, c) in series.items())
+    key = (tuple(symbol_list), period, limit, version, how)
+    panel = price_panels.get(key)
+    telemetry.cache_result("price_panel", panel is not None)
+    if panel is None:
+        with telemetry.stage("merge"):
+            panel = align_close_prices(series, how)
+        price_panels.put(key, panel)
+    return panel
+
+
+def get_backtest_result(symbols: str, period: str, price_df: pd.DataFrame, lookback: int, rebalance: int, algorithm: str, stats: str,
+                        risk_model: str = "sample", progress=None) -> BacktestResult:
+    from backend.backtest.pfopt import PfOptBacktest, _compute_equity_curve, _extend_equity_curve
+
+    params = BacktestCache.make_params(symbols.split(","), period, lookback, rebalance, algorithm, stats, risk_model)
+    fingerprint = price_fingerprint(price_df)
+    result = backtest_cache.get(params, fingerprint)
+    telemetry.cache_result("backtest", result is not None)
+    if result is not None:
+        return result
+
+    if risk_model == "sample":
+        bt = PfOptBacktest(price_df, lookback, rebalance, workers=DEFAULT_WORKERS, progress=progress)
+    else:
+        from backend.backtest.universe import LargeUniverseBacktest
+        bt = LargeUniverseBacktest(price_df, lookback, rebalance, risk_model, progress=progress)
+    previous = backtest_cache.latest(params)
+    if previous is not None and previous.is_prefix_of(price_df):
+        # new bars appended: only solve the rebalance windows after the cached ones
+        weight_history_df = bt.extend_weight_history(previous.weight_history, algorithm, stats)
+        equity_curve = _extend_equity_curve(price_df, weight_history_df, previous.equity_curve)
+        extended = True
+    else:
+        weight_history_df = bt.get_weight_history(algorithm, stats)
+        equity_curve = _compute_equity_curve(price_df, weight_history_df)
+        extended = False
+
+    result = BacktestResult(weight_history_df, equity_curve, fingerprint, len(price_df))
+    backtest_cache.put(params, result, extended=extended)
+    return result
+
+def backtest_report(symbols: str, period: str, limit: int, lookback: int, rebalance: int, algorithm: str, stats: str,
+                    risk_model: str = "sample", job: Optional[Job] = None) -> dict:
+    """The /bt response; with ``job``, progress is reported to it and cancellation honoured between stages."""
+    from backend.app.charts import generate_price_and_equity_chart_base64
+    from backend.backtest.pfopt import _rebase_equity_curve, _compute_performance_metrics
+
+    how = "inner" if risk_model == "sample" else "outer"
+    price_df = get_price_panel(symbols, period, limit, how).normalized().to_frame()
+    if job is not None:
+        job.check()
+    result = get_backtest_result(symbols, period, price_df, lookback, rebalance, algorithm, stats, risk_model,
+                                 progress=None if job is None else job.report)
+    equity_curve = _rebase_equity_curve(result.equity_curve, result.weight_history.index[0])
+    time = price_df.index.to_list()[-len(equity_curve):]
+    performance = _compute_performance_metrics(equity_curve, time)
+    if job is not None:
+        job.check()
+
+    # hundreds of price lines are unreadable, plot the largest current holdings
+    holdings = result.weight_history.iloc[-1].nlargest(MAX_CHART_SYMBOLS).index
+    chart_df = price_df if price_df.shape[1] <= MAX_CHART_SYMBOLS else price_df[holdings]
+    image_base64 = generate_price_and_equity_chart_base64(chart_df, equity_curve.tolist(), time)
+
+    return {"img_link": base64_to_link(image_base64), **performance, "partial_candles": partial_candles(symbols, period)}
 
 def base64_to_link(image_base64):
     return f"data:image/png;base64,{image_base64}"
 
-def generate_candlestick_base64(json_data: str) -> str:
-    # Step 1: Parse JSON string
-    ohlc_list = json.loads(json_data)
-    df = pd.DataFrame(ohlc_list)
-    df['time'] = pd.to_datetime(df['time'], unit='ms')
-
-    # Step 2: Plot using matplotlib
-    fig, ax = plt.subplots(figsize=(10, 5))
-    
-    for idx, row in df.iterrows():
-        color = 'green' if row['close'] >= row['open'] else 'red'
-        ax.add_patch(Rectangle(
-            (mdates.date2num(row['time']) - 0.2, min(row['open'], row['close'])),
-            0.4,
-            abs(row['close'] - row['open']),
-            color=color
-        ))
-        ax.vlines(mdates.date2num(row['time']),
-                  row['low'], row['high'],
-                  color=color, linewidth=1)
-
-    # Step 3: Format X-axis as dates
-    ax.xaxis_date()
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    ax.xaxis.set_major_locator(mticker.MaxNLocator(10))
-    fig.autofmt_xdate()
-
-    ax.set_ylabel('Price')
-
-    # Step 4: Convert to base64
-    buf = BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png')
-    plt.close(fig)
-    buf.seek(0)
-
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-
-    return image_base64
-
-def generate_multiline_chart_base64(json_data: str) -> str:
-    data = json.loads(json_data)
-    df = pd.DataFrame(data)
-    df['time'] = pd.to_datetime(df['time'], unit='ms')
-    df.set_index('time', inplace=True)
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-
-    gray_palette = ['#666666', '#888888', '#AAAAAA', '#BBBBBB']
-    for idx, column in enumerate(df.columns):
-        color = gray_palette[idx % len(gray_palette)]
-        ax.plot(df.index, df[column], label=column, color=color)
-
-    ax.set_ylabel("Price")
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    fig.autofmt_xdate()
-    ax.legend()
-
-    buf = BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png')
-    plt.close(fig)
-    buf.seek(0)
-
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-    return image_base64
-
-def generate_price_and_equity_chart_base64(
-    token_json_data: str,
-    equity_curve: list[float],
-    equity_timestamps: list[int]
-) -> str:
-    # Token prices
-    token_data = json.loads(token_json_data)
-    df_token = pd.DataFrame(token_data)
-    df_token['time'] = pd.to_datetime(df_token['time'], unit='ms')
-    df_token.set_index('time', inplace=True)
-
-    # Equity curve (shorter)
-    df_equity = pd.DataFrame({
-        'time': pd.to_datetime(equity_timestamps, unit='ms'),
-        'equity': equity_curve
-    }).set_index('time')
-
-    # Plot
-    fig, ax = plt.subplots(figsize=(10, 5))
-    gray_palette = ['#666666', '#888888', '#AAAAAA', '#BBBBBB']
-
-    # Plot token lines
-    for idx, column in enumerate(df_token.columns):
-        color = gray_palette[idx % len(gray_palette)]
-        ax.plot(df_token.index, df_token[column], label=column, color=color, linewidth=2)
-
-    # Plot equity curve (may start later)
-    ax.plot(df_equity.index, df_equity['equity'],
-            label='Equity Curve',
-            color='skyblue',
-            linewidth=3)
-
-    # Format chart
-    ax.set_ylabel("Price")
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    fig.autofmt_xdate()
-    ax.legend()
-    ax.grid(True, linestyle='--', alpha=0.3)
-
-    # Export to base64
-    buf = BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png')
-    plt.close(fig)
-    buf.seek(0)
-
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-    return image_base64
-
 #####################################################################################
 #####################################################################################
 ##########################        API Methods:     ##################################
@@ -216,29 +214,33 @@ def generate_price_and_equity_chart_base64(
 
 @app.get("/token_price")
 def get_token_price(
+    response: Response,
     symbol: str = Query(...),
     period: Literal["month", "week", "day", "4hour", "hour", "15min", "5min"] = Query("day"),
     limit: int = Query(1000)
 ):
     # return get_token_historical_prices()
+    from backend.app.charts import generate_candlestick_base64
     try:
-        json_data = get_cached_ohlc(symbol,period,limit)
-        image_base64 = generate_candlestick_base64(json_data)
+        ohlc_df = get_cached_ohlc(symbol,period,limit)
+        _flag_partial_candles(response, symbol, period)
+        image_base64 = generate_candlestick_base64(ohlc_df)
         return base64_to_link(image_base64)
     except Exception as e:
         return {"symbol":symbol, "period": period, "limit": limit, "error": str(e)}
 
 @app.get("/overview")
 def get_overview(
+    response: Response,
     symbols: str = Query(...),
     period: Literal["month", "week", "day", "4hour", "hour", "15min", "5min"] = Query("day"),
     limit: int = Query(1000)
 ):
+    from backend.app.charts import generate_multiline_chart_base64
     try:
-        df = get_price_df(symbols, period, limit)
-        df.iloc[:,1:] = df.iloc[:,1:]/df.iloc[0,1:]
-        json_data = df.to_json(orient="records")
-        image_base64 = generate_multiline_chart_base64(json_data)
+        price_df = get_price_panel(symbols, period, limit).normalized().to_frame()
+        _flag_partial_candles(response, symbols, period)
+        image_base64 = generate_multiline_chart_base64(price_df)
         return base64_to_link(image_base64)
     except Exception as e:
         return {"symbol":symbols, "period": period, "limit": limit, "error": str(e)}
@@ -250,26 +252,279 @@ def run_backtest(
         limit: int = Query(1000), 
         lookback: int = Query(90),
         rebalance: int = Query(30),
-        algorithm: Literal["mvo","hrp"] = Query("mvo")
+        algorithm: Literal["mvo","hrp"] = Query("mvo"),
+        stats: Literal["window","rolling"] = Query("window"),
+        risk_model: Literal["sample","shrinkage","factor"] = Query("sample")
 ):
+    # risk_model "shrinkage" / "factor" is the large-universe mode: outer-joined
+    # prices, per-token start dates and factored covariances (stats is ignored)
     try:
-        df = get_price_df(symbols, period, limit)
-        df.iloc[:,1:] = df.iloc[:,1:]/df.iloc[0,1:]
-        json_data = df.to_json(orient="records")
-
-        price_df = df.set_index('time')
-        bt = PfOptBacktest(price_df,lookback, rebalance)
-        equity_curve = bt.run(algorithm)
-        time = price_df.index.to_list()[-len(equity_curve):]
-        print(len(equity_curve), len(time))
-        performance = _compute_performance_metrics(equity_curve, time)
+        return backtest_report(symbols, period, limit, lookback, rebalance, algorithm, stats, risk_model)
+    except Exception as e:
+        return {"symbol":symbols, "period": period, "limit": limit, "lookback":lookback, "rebalance":rebalance, "error": str(e)}
 
-        image_base64 = generate_price_and_equity_chart_base64(json_data, equity_curve.tolist(), time)
+@app.get("/bt_sweep")
+def run_backtest_sweep(
+        symbols: str = Query(...),
+        period: Literal["month", "week", "day", "4hour", "hour", "15min", "5min"] = Query("day"),
+        limit: int = Query(1000),
+        lookback: str = Query("30:90:30"),
+        rebalance: str = Query("7,30"),
+        algorithm: str = Query("mvo,hrp"),
+        heatmap: bool = Query(False),
+        metric: Literal["Total Return", "Sharpe Ratio", "Max Drawdown", "Max Drawdown Duration (day)", "Profit Factor"] = Query("Sharpe Ratio")
+):
+    # lookback / rebalance accept "30,60,90" or an inclusive range "30:90:30"
+    from backend.app.charts import generate_sweep_heatmap_base64
+    from backend.backtest.sweep import parse_grid, run_sweep, sweep_to_records
+    try:
+        algorithms = [a.strip() for a in algorithm.split(",") if a.strip()]
+        for a in algorithms:
+            if a not in ("mvo", "hrp"):
+                raise ValueError(f'{a} not implemented, try: "mvo","hrp"')
+
+        price_df = get_price_panel(symbols, period, limit).normalized().to_frame()
+        results = run_sweep(price_df, parse_grid(lookback), parse_grid(rebalance), algorithms, workers=DEFAULT_WORKERS)
+
+        response = {"results": sweep_to_records(results)}
+        if heatmap and metric in results:
+            response["img_link"] = base64_to_link(generate_sweep_heatmap_base64(results, metric))
+        return response
+    except Exception as e:
+        return {"symbol":symbols, "period": period, "limit": limit, "lookback":lookback, "rebalance":rebalance, "error": str(e)}
 
-        return {"img_link": base64_to_link(image_base64), **performance}
+@app.get("/bt_bootstrap")
+def run_backtest_bootstrap(
+        symbols: str = Query(...),
+        period: Literal["month", "week", "day", "4hour", "hour", "15min", "5min"] = Query("day"),
+        limit: int = Query(1000),
+        lookback: int = Query(90),
+        rebalance: int = Query(30),
+        algorithm: Literal["mvo","hrp"] = Query("mvo"),
+        stats: Literal["window","rolling"] = Query("window"),
+        risk_model: Literal["sample","shrinkage","factor"] = Query("sample"),
+        paths: int = Query(1000),
+        block: int = Query(20),
+        confidence: float = Query(0.95),
+        seed: int = Query(0),
+        histogram: bool = Query(False)
+):
+    # the backtest's weight schedule replayed on block-bootstrapped return paths
+    from backend.app.charts import generate_bootstrap_histogram_base64
+    from backend.backtest.pfopt import _rebase_equity_curve, _compute_performance_metrics
+    from backend.backtest.bootstrap import bootstrap_backtest, summarize_bootstrap
+    try:
+        how = "inner" if risk_model == "sample" else "outer"
+        price_df = get_price_panel(symbols, period, limit, how).normalized().to_frame()
+        result = get_backtest_result(symbols, period, price_df, lookback, rebalance, algorithm, stats, risk_model)
+        equity_curve = _rebase_equity_curve(result.equity_curve, result.weight_history.index[0])
+        actual = _compute_performance_metrics(equity_curve, price_df.index.to_list()[-len(equity_curve):])
+
+        paths_df = bootstrap_backtest(price_df, result.weight_history, paths, block, seed)
+        summary = summarize_bootstrap(paths_df, confidence)
+        actual = {metric: actual[metric] for metric in paths_df.columns}
+
+        response = {"paths": len(paths_df), "block": block, "confidence": confidence, "backtest": actual, "bootstrap": summary}
+        if histogram:
+            response["img_link"] = base64_to_link(generate_bootstrap_histogram_base64(paths_df, actual, summary))
+        return response
     except Exception as e:
         return {"symbol":symbols, "period": period, "limit": limit, "lookback":lookback, "rebalance":rebalance, "error": str(e)}
 
+@app.get("/symbols")
+def search_symbols(
+    query: str = Query(...),
+    k: int = Query(20)
+):
+    return [vars(info) for info in get_symbol_index().search(query, k)]
+
+@app.get("/render_stats")
+def get_render_stats():
+    from backend.app.charts import chart_cache
+    return {
+        **get_render_pool().stats(),
+        "cache_hits": chart_cache.hits,
+        "cache_misses": chart_cache.misses,
+        "cache_bytes": chart_cache.size,
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(telemetry.render_metrics(), media_type="text/plain; version=0.0.4")
+
+def collect_gauges():
+    stats = get_render_pool().stats()
+    for name in ("queue_depth", "workers", "completed", "failed"):
+        yield f"render_pool_{name}", None, stats[name]
+    charts = sys.modules.get("backend.app.charts")
+    if charts is not None:
+        yield "chart_cache_bytes", None, charts.chart_cache.size
+    yield "backtest_cache_entries", None, backtest_cache.stats()["entries"]
+    if _sessions is not None:
+        yield "chat_sessions", None, _sessions.stats()["sessions"]
+    jobs = job_queue.stats()
+    yield "jobs_queued", None, jobs["queued"]
+    yield "jobs_running", None, jobs["running"]
+    if _rebalance_service is not None:
+        yield "rebalance_strategies", None, len(_rebalance_service.registry)
+
+telemetry.registry.register_collector(collect_gauges)
+
+######################################################################
+######################################################################
+####################            jobs          ########################
+######################################################################
+######################################################################
+
+# The job endpoints are async and never block: the work runs on the job
+# queue's own threads, not on the request threadpool.
+
+@app.post("/jobs/bt")
+async def submit_backtest_job(
+        response: Response,
+        symbols: str = Query(...),
+        period: Literal["month", "week", "day", "4hour", "hour", "15min", "5min"] = Query("day"),
+        limit: int = Query(1000),
+        lookback: int = Query(90),
+        rebalance: int = Query(30),
+        algorithm: Literal["mvo","hrp"] = Query("mvo"),
+        stats: Literal["window","rolling"] = Query("window"),
+        risk_model: Literal["sample","shrinkage","factor"] = Query("sample")
+):
+    params = (symbols, period, limit, lookback, rebalance, algorithm, stats, risk_model)
+    try:
+        job, deduplicated = job_queue.submit(("bt",) + params, lambda job: backtest_report(*params, job=job))
+    except QueueFull as e:
+        response.status_code = 429
+        response.headers["Retry-After"] = "10"
+        return {"error": str(e)}
+    response.status_code = 202
+    return {**job.to_dict(with_result=False), "deduplicated": deduplicated}
+
+@app.get("/jobs")
+async def get_job_stats():
+    return job_queue.stats()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, response: Response):
+    job = job_queue.get(job_id)
+    if job is None:
+        response.status_code = 404
+        return {"job_id": job_id, "error": "unknown job"}
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, response: Response):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        response.status_code = 404
+        return {"job_id": job_id, "error": "unknown job"}
+    return job.to_dict(with_result=False)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str, request: Request, response: Response, cancel_on_disconnect: bool = Query(False)):
+    # SSE: a "progress" event per change, then one "done" / "failed" / "cancelled" event with the final state
+    job = job_queue.get(job_id)
+    if job is None:
+        response.status_code = 404
+        return {"job_id": job_id, "error": "unknown job"}
+
+    async def events():
+        version = -1
+        while True:
+            if await request.is_disconnected():
+                if cancel_on_disconnect:
+                    job_queue.cancel(job_id)
+                return
+            if job.version != version:
+                version = job.version
+                info = job.to_dict()
+                if info["status"] in FINISHED:
+                    yield _sse(info, event=info["status"])
+                    return
+                yield _sse(info, event="progress")
+            new_version = await job.wait_for_change(version, timeout=15)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+######################################################################
+######################################################################
+####################          rebalance       ########################
+######################################################################
+######################################################################
+
+_rebalance_service = None
+_rebalance_lock = threading.Lock()
+
+def get_rebalance_service():
+    global _rebalance_service
+    with _rebalance_lock:
+        if _rebalance_service is None:
+            from backend.rebalance.strategies import StrategyRegistry
+            from backend.rebalance.holdings import MOCK_HOLDINGS_PATH, MockHoldingsSource
+            from backend.rebalance.service import RebalanceService
+
+            holdings = MockHoldingsSource.from_file(MOCK_HOLDINGS_PATH) if MOCK_HOLDINGS_PATH else MockHoldingsSource()
+            _rebalance_service = RebalanceService(StrategyRegistry(), ohlc_store, holdings, _symbol_address)
+        return _rebalance_service
+
+@app.post("/strategies")
+def register_strategy(
+        address: str = Query(...),
+        user: str = Query(...),
+        symbols: str = Query(...),
+        period: Literal["month", "week", "day", "4hour", "hour", "15min", "5min"] = Query("day"),
+        lookback: int = Query(90),
+        algorithm: Literal["mvo","hrp"] = Query("mvo")
+):
+    from backend.rebalance.strategies import StrategyConfig
+    try:
+        symbol_list = [s for s in symbols.split(",") if s]
+        for s in symbol_list:
+            _symbol_address(s)
+        config = StrategyConfig(address, user, tuple(symbol_list), period, lookback, algorithm)
+        return vars(get_rebalance_service().registry.register(config))
+    except Exception as e:
+        return {"address": address, "symbols": symbols, "error": str(e)}
+
+@app.get("/strategies")
+def list_strategies():
+    return [vars(config) for config in get_rebalance_service().registry.all()]
+
+@app.delete("/strategies/{address}")
+def remove_strategy(address: str, response: Response):
+    config = get_rebalance_service().registry.remove(address)
+    if config is None:
+        response.status_code = 404
+        return {"address": address, "error": "unknown strategy"}
+    return vars(config)
+
+@app.post("/rebalance")
+def run_rebalance(include_plans: bool = Query(False)):
+    # one planning round: one optimization per distinct configuration, one plan per strategy
+    from dataclasses import asdict
+    service = get_rebalance_service()
+    try:
+        plans = service.run_once()
+    except Exception as e:
+        return {"error": str(e)}
+    response = service.stats()
+    if include_plans:
+        response["plans"] = [asdict(plan) for plan in plans.values()]
+    return response
+
+@app.get("/rebalance/{address}")
+def get_rebalance_plan(address: str, response: Response):
+    from dataclasses import asdict
+    plan = get_rebalance_service().plan(address)
+    if plan is None:
+        response.status_code = 404
+        return {"address": address, "error": "no plan yet, POST /rebalance first"}
+    return asdict(plan)
+
 ######################################################################
 ######################################################################
 ####################          survey          ########################
@@ -281,8 +536,6 @@ def initialize_user_profile():
     if os.path.exists(fn):
         os.remove(fn)
 
-initialize_user_profile()
-
 
 @app.get("/survey")
 async def get_survey():
@@ -345,9 +598,26 @@ def read_user_info(file_path:str) -> str:
 ######################################################################
 
 
-llm = ChatOpenAI(model="gpt-4o", api_key=os.getenv("OPENAI_API_KEY"))
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+def build_llm(backend: str = LLM_BACKEND):
+    if backend == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model="gpt-4o", api_key=os.getenv("OPENAI_API_KEY"))
+    if backend == "fake":
+        from langchain_core.language_models import FakeListChatModel
+        # local stand-in for development and load tests: streams a canned answer char by char
+        return FakeListChatModel(
+            responses=[os.getenv("FAKE_LLM_RESPONSE", "Hi! I can help you pick tokens, compare MVO and HRP, and run a backtest.")],
+            sleep=float(os.getenv("FAKE_LLM_SLEEP", "0.01")),
+        )
+    raise NotImplementedError(f'{backend} not implemented, try: "openai","fake"')
 
 def build_qa_chain(llm):
+    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.runnables import RunnableParallel
+
     q_system_prompt = """You are a portfolio assistant integrated with 1inch Fusion+ and other crypto tools. Your job is to help users build and manage token portfolios. You can:
 - Help select tokens for an asset pool
 - Explain token properties, use cases, or fundamentals
@@ -374,38 +644,140 @@ here are the user info:
         ]
     )
     qa_chain = create_stuff_documents_chain(llm, qa_prompt)
-    wrapped_chain = qa_chain | RunnableLambda(lambda x: {"answer": x})
+    # a parallel map keeps the chain streamable: chunks come out as {"answer": token}
+    wrapped_chain = RunnableParallel(answer=qa_chain)
 
     return wrapped_chain
 
-available_symbols = [
-    Document(page_content=str(pd.read_csv('backend/oneinch/available_symbol.csv')['symbol'].to_list()))
-]
-
-store = {}
-
-def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
-
-qa_chain = build_qa_chain(llm)
-conversation_chain = RunnableWithMessageHistory(
-    qa_chain,
-    get_session_history,
-    input_messages_key="input",
-    history_messages_key="chat_history",
-    output_messages_key="answer"
-)
+def relevant_symbols(user_input: str) -> list:
+    from langchain_core.documents import Document
+    # only the top-k symbols for this turn, not the whole symbol table
+    return [Document(page_content=get_symbol_index().context(user_input))]
+
+_sessions = None
+_conversation_chain = None
+_chat_lock = threading.Lock()
+
+def get_sessions():
+    global _sessions
+    with _chat_lock:
+        if _sessions is None:
+            from backend.app.sessions import SessionStore
+            # LRU/TTL-bounded histories, each windowed to CHAT_HISTORY_TOKENS
+            _sessions = SessionStore()
+        return _sessions
+
+def get_session_history(session_id: str):
+    return get_sessions().get(session_id)
+
+def get_conversation_chain():
+    global _conversation_chain
+    get_sessions()
+    with _chat_lock:
+        if _conversation_chain is None:
+            from langchain_core.runnables.history import RunnableWithMessageHistory
+            _conversation_chain = RunnableWithMessageHistory(
+                build_qa_chain(build_llm()),
+                get_session_history,
+                input_messages_key="input",
+                history_messages_key="chat_history",
+                output_messages_key="answer"
+            )
+        return _conversation_chain
+
+def _resolve_session_id(session_id: Optional[str], cookie_session_id: Optional[str]) -> str:
+    # explicit query parameter, then the cookie, else a new session
+    return session_id or cookie_session_id or uuid.uuid4().hex
+
+def _chat_input(user_input: str, session_id: str) -> dict:
+    # blocking (file read, symbol retrieval, history loaded from the session DB): run in the threadpool
+    get_session_history(session_id)
+    user_info = read_user_info('backend/LLM_config/user.json')
+    return {"input": user_input, "user_info": user_info, "context": relevant_symbols(user_input)}
 
 @app.post("/chat")
-async def post_chat(user_input: str):
+async def post_chat(
+    user_input: str,
+    response: Response,
+    session_id: Optional[str] = Query(None, max_length=64),
+    chat_session: Optional[str] = Cookie(None, max_length=64)
+):
+    session_id = _resolve_session_id(session_id, chat_session)
+    # the first call imports the LLM stack: keep that off the event loop
+    conversation_chain = await run_in_threadpool(get_conversation_chain)
+    chat_input = await run_in_threadpool(_chat_input, user_input, session_id)
+    answer = await conversation_chain.ainvoke(
+        chat_input,
+        config={"configurable": {"session_id": session_id}}
+    )
+    response.set_cookie("chat_session", session_id, samesite="lax")
+    return {**answer, "session_id": session_id}
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/chat_stream")
+async def post_chat_stream(
+    user_input: str,
+    request: Request,
+    session_id: Optional[str] = Query(None, max_length=64),
+    chat_session: Optional[str] = Cookie(None, max_length=64)
+):
+    session_id = _resolve_session_id(session_id, chat_session)
+    conversation_chain = await run_in_threadpool(get_conversation_chain)
+    chat_input = await run_in_threadpool(_chat_input, user_input, session_id)
+
+    # Server-Sent Events: one "data" message per answer chunk, then an "end" event with the full answer
+    async def events():
+        stream = conversation_chain.astream(
+            chat_input,
+            config={"configurable": {"session_id": session_id}}
+        )
+        answer = []
+        try:
+            async for chunk in stream:
+                if await request.is_disconnected():
+                    break
+                if chunk.get("answer"):
+                    answer.append(chunk["answer"])
+                    yield _sse({"answer": chunk["answer"]})
+            else:
+                # the whole answer again, for clients that only want the result
+                yield _sse({"answer": "".join(answer), "session_id": session_id}, event="end")
+        except Exception as e:
+            yield _sse({"error": str(e)}, event="error")
+        finally:
+            # stops the model call when the client went away
+            await stream.aclose()
+
+    response = StreamingResponse(events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id})
+    response.set_cookie("chat_session", session_id, samesite="lax")
+    return response
 
-    user_info = read_user_info('backend/LLM_config/user.json')
+######################################################################
+######################################################################
+####################          startup         ########################
+######################################################################
+######################################################################
 
-    response = conversation_chain.invoke(
-        {"input": user_input, "user_info": user_info, "context": available_symbols},
-        config={"configurable": {"session_id": "default"}}
-    )
-    print(store)
-    return response
\ No newline at end of file
+def warm_up():
+    # load the lazy subsystems before the first request needs them
+    import backend.app.charts
+    import backend.backtest.pfopt
+    import backend.backtest.sweep
+    get_symbol_index()
+    get_conversation_chain()
+
+def on_startup():
+    initialize_user_profile()
+    from backend.rebalance.service import REBALANCE_INTERVAL
+    if REBALANCE_INTERVAL > 0:
+        get_rebalance_service().start(REBALANCE_INTERVAL)
+    if WARM_START:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def on_shutdown():
+    if _rebalance_service is not None:
+        _rebalance_service.stop()
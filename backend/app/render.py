@@ -0,0 +1,115 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Literal, Optional
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_POOL = os.getenv("RENDER_POOL", "process")
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "64"))
+RENDER_QUEUE_TIMEOUT = float(os.getenv("RENDER_QUEUE_TIMEOUT", "30"))
+
+
+def _timed_call(func, args, kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class RenderPool:
+    """
+    Bounded pool that renders charts off the request threads.
+
+    At most ``max_queue`` renders are queued or running; further callers wait
+    up to ``queue_timeout`` seconds for a slot. Render functions must be
+    module-level so they can be sent to worker processes.
+    """
+
+    def __init__(self,
+                 workers: int = RENDER_WORKERS,
+                 kind: Literal['process', 'thread'] = RENDER_POOL,
+                 max_queue: int = RENDER_QUEUE_SIZE,
+                 queue_timeout: float = RENDER_QUEUE_TIMEOUT):
+        self.workers = workers
+        self.kind = kind
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._render_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_render_seconds = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    # spawn: the API process runs threads, forking it is not safe
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+            return self._executor
+
+    def render(self, func, *args, **kwargs):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RuntimeError("render queue is full, try again later")
+        with self._lock:
+            self._pending += 1
+        start = time.perf_counter()
+        try:
+            result, render_seconds = self._get_executor().submit(_timed_call, func, args, kwargs).result()
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+        total = time.perf_counter() - start
+        with self._lock:
+            self._completed += 1
+            self._render_seconds += render_seconds
+            self._wait_seconds += max(total - render_seconds, 0.0)
+            self._max_render_seconds = max(self._max_render_seconds, render_seconds)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                'kind': self.kind,
+                'workers': self.workers,
+                'queue_depth': self._pending,
+                'max_queue': self.max_queue,
+                'completed': completed,
+                'failed': self._failed,
+                'avg_render_ms': 1000 * self._render_seconds / completed if completed else 0.0,
+                'max_render_ms': 1000 * self._max_render_seconds,
+                'avg_queue_wait_ms': 1000 * self._wait_seconds / completed if completed else 0.0,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_render_pool: Optional[RenderPool] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = RenderPool()
+        return _render_pool
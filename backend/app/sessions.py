@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Optional, Sequence
+
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, Text, create_engine, func, select
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", str(24 * 3600)))
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))
+CHAT_DB_URL = os.getenv("CHAT_DB_URL") or None      # e.g. sqlite:///backend/data/chat.db
+
+
+def count_tokens(message: BaseMessage) -> int:
+    # ~4 characters per token for English text, plus a few for the role
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return len(content) // 4 + 4
+
+
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history that keeps only the most recent turns within ``token_budget``.
+
+    Older messages are dropped as new ones arrive, so what is replayed into
+    the prompt (and held in memory) never exceeds the budget. A human message
+    and the answer to it are dropped together.
+    """
+
+    def __init__(self, token_budget: int = CHAT_HISTORY_TOKENS, messages: Sequence[BaseMessage] = ()):
+        self.token_budget = token_budget
+        self._messages: deque = deque()
+        self._tokens = 0
+        self._lock = threading.Lock()
+        self._append(messages)
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        with self._lock:
+            return list(self._messages)
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens
+
+    def _append(self, messages: Sequence[BaseMessage]):
+        for message in messages:
+            self._messages.append(message)
+            self._tokens += count_tokens(message)
+        # trim whole turns from the front, always keeping the last one
+        while self._tokens > self.token_budget and len(self._messages) > 1:
+            self._tokens -= count_tokens(self._messages.popleft())
+            while self._messages and not isinstance(self._messages[0], HumanMessage) and len(self._messages) > 1:
+                self._tokens -= count_tokens(self._messages.popleft())
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            self._append(messages)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages.clear()
+            self._tokens = 0
+
+
+class _PersistentChatMessageHistory(WindowedChatMessageHistory):
+    """Windowed history that also appends every message to the SQL store."""
+
+    def __init__(self, store: "SessionStore", session_id: str, token_budget: int, messages: Sequence[BaseMessage] = ()):
+        super().__init__(token_budget, messages)
+        self._store = store
+        self._session_id = session_id
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        super().add_messages(messages)
+        self._store._insert(self._session_id, messages)
+
+    def clear(self) -> None:
+        super().clear()
+        self._store._delete(self._session_id)
+
+
+class SessionStore:
+    """
+    Chat histories per session id.
+
+    At most ``max_sessions`` histories are held in memory (LRU), and a session
+    idle for more than ``ttl`` seconds is dropped. With ``db_url`` set every
+    message is also written through SQLAlchemy (local SQLite is enough), so
+    sessions evicted from memory or lost in a restart are reloaded from disk,
+    windowed to the token budget again.
+    """
+
+    def __init__(self,
+                 max_sessions: int = CHAT_MAX_SESSIONS,
+                 ttl: float = CHAT_SESSION_TTL,
+                 token_budget: int = CHAT_HISTORY_TOKENS,
+                 db_url: Optional[str] = CHAT_DB_URL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, tuple[WindowedChatMessageHistory, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_db_prune = 0.0
+
+        self._engine = None
+        if db_url is not None:
+            self._init_db(db_url)
+
+    def _init_db(self, db_url: str):
+        if db_url.startswith("sqlite:///"):
+            directory = os.path.dirname(db_url[len("sqlite:///"):])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._engine = create_engine(db_url)
+        metadata = MetaData()
+        self._table = Table(
+            "chat_messages", metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("session_id", String(64), nullable=False),
+            Column("role", String(16), nullable=False),
+            Column("content", Text, nullable=False),
+            Column("created_at", Float, nullable=False),
+            Index("ix_chat_messages_session", "session_id", "id"),
+        )
+        metadata.create_all(self._engine)
+
+    def _insert(self, session_id: str, messages: Sequence[BaseMessage]):
+        now = time.time()
+        rows = [{"session_id": session_id, "role": "human" if isinstance(m, HumanMessage) else "ai",
+                 "content": m.content if isinstance(m.content, str) else str(m.content), "created_at": now}
+                for m in messages]
+        if rows:
+            with self._engine.begin() as conn:
+                conn.execute(self._table.insert(), rows)
+
+    def _delete(self, session_id: str):
+        with self._engine.begin() as conn:
+            conn.execute(self._table.delete().where(self._table.c.session_id == session_id))
+
+    def _load(self, session_id: str) -> list[BaseMessage]:
+        table = self._table
+        # newest first, only as many rows as can fit in the budget
+        query = (select(table.c.role, table.c.content, table.c.created_at)
+                 .where(table.c.session_id == session_id)
+                 .order_by(table.c.id.desc())
+                 .limit(max(self.token_budget // 4, 2)))
+        with self._engine.connect() as conn:
+            rows = conn.execute(query).fetchall()
+        if not rows or time.time() - rows[0].created_at > self.ttl:
+            return []
+        return [HumanMessage(content=r.content) if r.role == "human" else AIMessage(content=r.content) for r in reversed(rows)]
+
+    def _prune_db(self, now: float):
+        # expired sessions: nothing written since now - ttl
+        table = self._table
+        stale = (select(table.c.session_id).group_by(table.c.session_id)
+                 .having(func.max(table.c.created_at) < now - self.ttl))
+        with self._engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.session_id.in_(stale)))
+
+    def _evict(self, now: float):
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._sessions[session_id] = (entry[0], now)
+                self._sessions.move_to_end(session_id)
+                return entry[0]
+
+        if self._engine is None:
+            history = WindowedChatMessageHistory(self.token_budget)
+        else:
+            history = _PersistentChatMessageHistory(self, session_id, self.token_budget, self._load(session_id))
+
+        with self._lock:
+            # another request may have created it meanwhile
+            entry = self._sessions.get(session_id)
+            if entry is not None and now - entry[1] <= self.ttl:
+                history = entry[0]
+            self._sessions[session_id] = (history, now)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+            prune = self._engine is not None and now - self._last_db_prune > 60
+            if prune:
+                self._last_db_prune = now
+        if prune:
+            self._prune_db(now)
+        return history
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "evictions": self.evictions,
+                "history_tokens": sum(history.tokens for history, _ in self._sessions.values()),
+                "persistent": self._engine is not None,
+            }
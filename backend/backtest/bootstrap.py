@@ -0,0 +1,110 @@
+"""
+Block-bootstrap robustness test of a backtest.
+
+The weight schedule of a backtest is replayed on ``n_paths`` resampled return
+paths instead of the one observed path. Paths are built from circular moving
+blocks of whole rows of the price panel's returns, so cross-asset correlation
+and short-range autocorrelation survive the resampling. All paths are
+evaluated at once as a (paths, bars, assets) array, in chunks of at most
+``max_bytes``.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.backtest.metrics import compute_batch_metrics
+from backend import telemetry
+
+# past a few tens of MB per chunk the gather falls out of cache and gets slower, not faster
+DEFAULT_MAX_BYTES = int(os.getenv("BOOTSTRAP_MAX_BYTES", str(32 * 1024 * 1024)))
+MAX_PATHS = int(os.getenv("BOOTSTRAP_MAX_PATHS", "100000"))
+
+
+def _replay_inputs(price_df: pd.DataFrame, weight_history_df: pd.DataFrame, transaction_cost: float):
+    # the weights held over each bar and the turnover cost charged at it, exactly
+    # as _compute_equity_curve does, from the bar after the first rebalance on
+    weights = weight_history_df.reindex(price_df.index, method='ffill')
+    held = weights.shift().fillna(0).values
+    cost = (weights.diff().abs().sum(axis=1) * transaction_cost).values
+    start = price_df.index.get_loc(weight_history_df.index[0])
+    return held[start + 1:], cost[start + 1:], start
+
+
+def _block_indices(starts: np.ndarray, block: int, length: int, n_source: int) -> np.ndarray:
+    # (paths, blocks) block starts -> (paths, length) rows, wrapping around the source
+    indices = (starts[:, :, None] + np.arange(block)).reshape(len(starts), -1)[:, :length]
+    return indices % n_source
+
+
+def _replay(returns: np.ndarray, held: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    # (paths, bars, assets) returns -> (paths, bars + 1) equity starting at 1
+    net_returns = np.einsum('pba,ba->pb', returns, held) - cost
+    equity = np.ones((len(returns), returns.shape[1] + 1))
+    np.cumprod(1 + net_returns, axis=1, out=equity[:, 1:])
+    return equity
+
+
+@telemetry.timed("bootstrap")
+def bootstrap_backtest(price_df: pd.DataFrame,
+                       weight_history_df: pd.DataFrame,
+                       n_paths: int = 1000,
+                       block: int = 20,
+                       seed: int = 0,
+                       transaction_cost: float = 0.001,
+                       max_bytes: int = DEFAULT_MAX_BYTES) -> pd.DataFrame:
+    """
+    Metrics of the rebased equity curve on each of ``n_paths`` resampled paths,
+    one row per path. The same ``seed`` gives the same paths whatever the chunking.
+    """
+    if not 0 < n_paths <= MAX_PATHS:
+        raise ValueError(f"n_paths must be between 1 and {MAX_PATHS}")
+    if block < 1:
+        raise ValueError("block must be positive")
+
+    held, cost, start = _replay_inputs(price_df, weight_history_df, transaction_cost)
+    # NaN before a token's first price, as in _compute_equity_curve
+    source = price_df.pct_change().fillna(0).values[1:]
+    if len(held) < 2 or len(source) == 0:
+        raise ValueError("not enough bars after the first rebalance")
+    time = price_df.index.values[start:]
+
+    # block starts for every path up front, so chunking does not change the draws
+    rng = np.random.default_rng(seed)
+    n_blocks = -(-len(held) // block)
+    starts = rng.integers(0, len(source), (n_paths, n_blocks))
+
+    # the gathered returns dominate; equity and its temporaries are a few rows per asset
+    bytes_per_path = 8 * len(held) * (source.shape[1] + 4)
+    chunk = max(1, max_bytes // bytes_per_path)
+
+    results = []
+    for first in range(0, n_paths, chunk):
+        indices = _block_indices(starts[first:first + chunk], block, len(held), len(source))
+        equity = _replay(source[indices], held, cost)
+        results.append(pd.DataFrame(compute_batch_metrics(equity, time)))
+    return pd.concat(results, ignore_index=True)
+
+
+def summarize_bootstrap(paths_df: pd.DataFrame, confidence: float = 0.95) -> dict:
+    """Mean, spread and the central ``confidence`` interval of every metric over the paths."""
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    tail = 100 * (1 - confidence) / 2
+    summary = {}
+    for metric in paths_df.columns:
+        values = paths_df[metric].to_numpy(dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            continue
+        low, median, high = np.percentile(values, [tail, 50, 100 - tail])
+        summary[metric] = {
+            'mean': float(values.mean()),
+            'std': float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+            'median': float(median),
+            'ci_low': float(low),
+            'ci_high': float(high),
+        }
+    if 'Total Return' in paths_df:
+        summary['Probability of Loss'] = float((paths_df['Total Return'] < 0).mean())
+    return summary
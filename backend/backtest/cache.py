@@ -0,0 +1,137 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_ENTRIES = int(os.getenv("BACKTEST_CACHE_SIZE", "128"))
+DEFAULT_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR") or None
+
+
+def price_fingerprint(price_df: pd.DataFrame) -> str:
+    """Data version of a price panel: hash of its columns, index and values."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(price_df.columns)).encode())
+    h.update(np.ascontiguousarray(price_df.index.values).tobytes())
+    h.update(np.ascontiguousarray(price_df.values, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+@dataclass
+class BacktestResult:
+    weight_history: pd.DataFrame    # clipped and normalized weights per rebalance date
+    equity_curve: pd.Series         # _compute_equity_curve output over the full price index
+    fingerprint: str
+    n_rows: int
+
+    def is_prefix_of(self, price_df: pd.DataFrame) -> bool:
+        """True when ``price_df`` is the cached price panel with new bars appended."""
+        if len(price_df) <= self.n_rows or list(price_df.columns) != list(self.weight_history.columns):
+            return False
+        if price_df.index[self.n_rows - 1] != self.equity_curve.index[-1]:
+            return False
+        return price_fingerprint(price_df.iloc[:self.n_rows]) == self.fingerprint
+
+
+class BacktestCache:
+    """
+    LRU of backtest results keyed by (symbols, period, lookback, rebalance,
+    algorithm, stats) and the price data fingerprint, optionally persisted to disk.
+
+    ``latest(params)`` returns the most recent result for the parameters
+    regardless of data version, so callers can extend it when new bars arrive.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES, persist_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.max_entries = max_entries
+        self.persist_dir = persist_dir
+        self.hits = 0
+        self.misses = 0
+        self.extensions = 0
+        self._results: "OrderedDict[tuple, BacktestResult]" = OrderedDict()
+        self._latest: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_params(symbols: list[str], period: str, lookback: int, rebalance: int, algorithm: str, stats: str = 'window',
+                    risk_model: str = 'sample') -> tuple:
+        params = (tuple(symbols), period, int(lookback), int(rebalance), algorithm, stats)
+        # sample-covariance keys stay as they were so persisted results remain valid
+        return params if risk_model == 'sample' else params + (risk_model,)
+
+    def _path(self, params: tuple, fingerprint: Optional[str]) -> str:
+        name = hashlib.blake2b(repr(params).encode(), digest_size=16).hexdigest()
+        suffix = 'latest' if fingerprint is None else fingerprint
+        return os.path.join(self.persist_dir, f"{name}.{suffix}.pkl")
+
+    def _read_disk(self, params: tuple, fingerprint: Optional[str]) -> Optional[BacktestResult]:
+        if self.persist_dir is None:
+            return None
+        try:
+            with open(self._path(params, fingerprint), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write_disk(self, params: tuple, result: BacktestResult):
+        if self.persist_dir is None:
+            return
+        os.makedirs(self.persist_dir, exist_ok=True)
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        for fingerprint in (result.fingerprint, None):
+            path = self._path(params, fingerprint)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+    def _remember(self, params: tuple, result: BacktestResult):
+        with self._lock:
+            key = (params, result.fingerprint)
+            self._results[key] = result
+            self._results.move_to_end(key)
+            self._latest[params] = result.fingerprint
+            while len(self._results) > self.max_entries:
+                (old_params, old_fingerprint), _ = self._results.popitem(last=False)
+                if self._latest.get(old_params) == old_fingerprint:
+                    del self._latest[old_params]
+
+    def get(self, params: tuple, fingerprint: str) -> Optional[BacktestResult]:
+        with self._lock:
+            result = self._results.get((params, fingerprint))
+            if result is not None:
+                self._results.move_to_end((params, fingerprint))
+        if result is None:
+            result = self._read_disk(params, fingerprint)
+            if result is not None:
+                self._remember(params, result)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def latest(self, params: tuple) -> Optional[BacktestResult]:
+        with self._lock:
+            fingerprint = self._latest.get(params)
+            result = None if fingerprint is None else self._results.get((params, fingerprint))
+        if result is None:
+            result = self._read_disk(params, None)
+        return result
+
+    def put(self, params: tuple, result: BacktestResult, extended: bool = False):
+        self._remember(params, result)
+        self._write_disk(params, result)
+        if extended:
+            with self._lock:
+                self.extensions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._results), 'hits': self.hits, 'misses': self.misses, 'extensions': self.extensions}
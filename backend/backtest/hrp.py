@@ -0,0 +1,89 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import scipy.cluster.hierarchy as sch
+import scipy.spatial.distance as ssd
+
+
+def cov_to_corr(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diag(cov))
+    corr = cov / np.outer(std, std)
+    np.fill_diagonal(corr, 1.0)
+    return np.clip(corr, -1, 1)
+
+
+def quasi_diagonal_order(corr: np.ndarray, linkage_method: str = 'single') -> np.ndarray:
+    """Leaf order of the correlation-distance dendrogram (HRPOpt._get_quasi_diag)."""
+    dist = np.sqrt(np.clip((1.0 - corr) / 2.0, 0.0, 1.0))
+    link = sch.linkage(ssd.squareform(dist, checks=False), linkage_method)
+    # leaves_list walks the tree iteratively, same order as to_tree().pre_order()
+    return sch.leaves_list(link)
+
+
+def _bisection_weights(cov: np.ndarray) -> np.ndarray:
+    """
+    Recursive bisection on a covariance matrix already in quasi-diagonal order.
+
+    All clusters of one tree level are handled at once: cluster labels mask the
+    covariance into its diagonal blocks, and the inverse-variance portfolio
+    variance of every cluster comes out of one mat-vec and a bincount.
+    """
+    n = len(cov)
+    weights = np.ones(n)
+    inv_diag = 1.0 / np.diag(cov)
+    clusters = [(0, n)]
+
+    while clusters:
+        halves = []
+        for start, end in clusters:
+            if end - start > 1:
+                mid = start + (end - start) // 2
+                halves.append((start, mid))
+                halves.append((mid, end))
+        if not halves:
+            break
+
+        labels = np.full(n, -1)
+        for c, (start, end) in enumerate(halves):
+            labels[start:end] = c
+        members = labels >= 0
+        idx = np.flatnonzero(members)
+        lab = labels[idx]
+
+        # inverse-variance weights normalised within each cluster
+        ivp = inv_diag[idx]
+        ivp = ivp / np.bincount(lab, weights=ivp)[lab]
+        block = cov[np.ix_(idx, idx)] * (lab[:, None] == lab[None, :])
+        cluster_var = np.bincount(lab, weights=ivp * (block @ ivp))
+
+        first_var, second_var = cluster_var[0::2], cluster_var[1::2]
+        alpha = 1 - first_var / (first_var + second_var)
+        scale = np.empty(len(halves))
+        scale[0::2] = alpha
+        scale[1::2] = 1 - alpha
+        weights[idx] *= scale[lab]
+
+        clusters = halves
+    return weights
+
+
+def hrp_weights_from_cov(cov: np.ndarray, corr: Optional[np.ndarray] = None, linkage_method: str = 'single') -> np.ndarray:
+    """HRP weights in the column order of ``cov``."""
+    cov = np.asarray(cov, dtype=np.float64)
+    corr = cov_to_corr(cov) if corr is None else np.asarray(corr, dtype=np.float64)
+    order = quasi_diagonal_order(corr, linkage_method)
+    weights = np.empty(len(cov))
+    weights[order] = _bisection_weights(cov[np.ix_(order, order)])
+    return weights
+
+
+def hrp_weights(data: np.ndarray, linkage_method: str = 'single') -> np.ndarray:
+    """HRP weights from a (rows, assets) matrix, as ``HRPOpt(data).optimize()``."""
+    data = np.asarray(data, dtype=np.float64)
+    cov = np.cov(data, rowvar=False)
+    return hrp_weights_from_cov(cov, np.corrcoef(data, rowvar=False), linkage_method)
+
+
+def hrp_weight_series(data: pd.DataFrame, linkage_method: str = 'single') -> pd.Series:
+    return pd.Series(hrp_weights(data.values, linkage_method), index=data.columns)
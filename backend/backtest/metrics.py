@@ -0,0 +1,144 @@
+import numpy as np
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+class PerformanceAccumulator:
+    """
+    One-pass performance metrics over an equity curve.
+
+    Feed equity points one at a time with ``update`` or in chunks with
+    ``update_many`` (vectorized within the chunk); ``metrics()`` can be read at
+    any moment and costs O(1). Timestamps are in ms, as in the price panels.
+    The state is a handful of scalars, so arbitrarily long series never have
+    to be held in memory.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.first_equity = np.nan
+        self.last_equity = np.nan
+        self.first_time = np.nan
+        self.last_time = np.nan
+
+        # Welford / Chan running moments of the log returns
+        self._n_returns = 0
+        self._mean = np.float64(0.0)
+        self._m2 = np.float64(0.0)
+
+        self.peak = -np.inf
+        self.peak_time = np.nan
+        self.max_drawdown = np.float64(0.0)
+        self.max_duration = 0.0          # seconds
+
+        self.gross_profit = np.float64(0.0)
+        self.gross_loss = np.float64(0.0)
+
+    def update(self, equity: float, time: float):
+        self.update_many(np.array([equity], dtype=np.float64), np.array([time], dtype=np.float64))
+
+    def update_many(self, equity, time):
+        equity = np.asarray(equity, dtype=np.float64)
+        time = np.asarray(time, dtype=np.float64) / 1000
+        if len(equity) == 0:
+            return self
+
+        if self.count == 0:
+            self.first_equity = equity[0]
+            self.first_time = time[0]
+            chained = equity
+        else:
+            # pair the first new point with the last one already seen
+            chained = np.concatenate([[self.last_equity], equity])
+
+        # log returns and pnl
+        log_returns = np.diff(np.log(chained))
+        pnl = np.diff(chained)
+        self._merge_moments(log_returns)
+        self.gross_profit += pnl[pnl > 0].sum()
+        self.gross_loss -= pnl[pnl < 0].sum()
+
+        # drawdown: running peak including everything seen before this chunk
+        peak_before = np.maximum.accumulate(np.concatenate([[self.peak], equity]))[:-1]
+        is_high = equity >= peak_before
+        peak = np.maximum(peak_before, equity)
+        self.max_drawdown = min(self.max_drawdown, np.min(equity / peak - 1))
+
+        # drawdown duration: time since the last new high, for points below it
+        high_idx = np.maximum.accumulate(np.where(is_high, np.arange(len(equity)), -1))
+        high_time = np.where(high_idx >= 0, time[np.maximum(high_idx, 0)], self.peak_time)
+        below = ~is_high
+        if below.any():
+            self.max_duration = max(self.max_duration, np.max(time[below] - high_time[below]))
+        if high_idx[-1] >= 0:
+            self.peak_time = time[high_idx[-1]]
+        self.peak = peak[-1]
+
+        self.count += len(equity)
+        self.last_equity = equity[-1]
+        self.last_time = time[-1]
+        return self
+
+    def _merge_moments(self, x: np.ndarray):
+        n_b = len(x)
+        if n_b == 0:
+            return
+        mean_b = x.mean()
+        m2_b = ((x - mean_b) ** 2).sum()
+        n_a = self._n_returns
+        n = n_a + n_b
+        delta = mean_b - self._mean
+        self._mean = self._mean + delta * n_b / n
+        self._m2 = self._m2 + m2_b + delta ** 2 * n_a * n_b / n
+        self._n_returns = n
+
+    def sharpe_ratio(self) -> float:
+        if self._n_returns < 2:
+            return np.nan
+        avg_seconds = (self.last_time - self.first_time) / self._n_returns
+        freq_per_year = SECONDS_PER_YEAR / avg_seconds
+        std = np.sqrt(self._m2 / (self._n_returns - 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._mean / std * np.sqrt(freq_per_year)
+
+    def metrics(self) -> dict:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_factor = self.gross_profit / self.gross_loss if self.gross_loss != 0 else np.inf
+        return {
+            'Total Return': self.last_equity / self.first_equity - 1,
+            'Sharpe Ratio': self.sharpe_ratio(),
+            'Max Drawdown': self.max_drawdown,
+            'Max Drawdown Duration (day)': self.max_duration / 86400,
+            'Profit Factor': profit_factor,
+        }
+
+
+def compute_performance_metrics(equity_curve, time) -> dict:
+    """Vectorized metrics of a whole equity curve, ``time`` in ms."""
+    return PerformanceAccumulator().update_many(equity_curve, time).metrics()
+
+
+def compute_batch_metrics(equity, time) -> dict:
+    """
+    Total Return, Sharpe Ratio and Max Drawdown of every row of a (paths, bars)
+    equity array sharing the timestamps ``time`` (ms), with the same
+    definitions as ``PerformanceAccumulator``.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    time = np.asarray(time, dtype=np.float64) / 1000
+    log_returns = np.diff(np.log(equity), axis=1)
+    n_returns = log_returns.shape[1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if n_returns < 2:
+            sharpe = np.full(len(equity), np.nan)
+        else:
+            freq_per_year = SECONDS_PER_YEAR / ((time[-1] - time[0]) / n_returns)
+            sharpe = log_returns.mean(axis=1) / log_returns.std(axis=1, ddof=1) * np.sqrt(freq_per_year)
+        drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+
+    return {
+        'Total Return': equity[:, -1] / equity[:, 0] - 1,
+        'Sharpe Ratio': sharpe,
+        'Max Drawdown': drawdown.min(axis=1),
+    }
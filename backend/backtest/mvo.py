@@ -0,0 +1,192 @@
+import os
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+from pypfopt import EfficientFrontier
+
+from backend import telemetry
+from backend.backtest.risk import LowRankCovariance
+
+# keep the same risk-free rate EfficientFrontier.max_sharpe() uses by default
+DEFAULT_RISK_FREE_RATE = inspect.signature(EfficientFrontier.max_sharpe).parameters['risk_free_rate'].default
+
+# compiled engines kept per thread, least recently used dropped first
+MVO_ENGINE_CACHE = int(os.getenv("MVO_ENGINE_CACHE", "8"))
+# factor engines are compiled for universe sizes / ranks rounded up to these steps
+FACTOR_ASSET_STEP = 16
+FACTOR_RANK_STEP = 4
+
+
+def _cov_sqrt(cov: np.ndarray) -> np.ndarray:
+    # F with F.T @ F == cov, also for singular (PSD) covariance matrices
+    q, V = np.linalg.eigh((cov + cov.T) / 2)
+    return np.sqrt(np.clip(q, 0, None))[:, None] * V.T
+
+
+class MVOEngine:
+    """
+    Pre-compiled long-only max-Sharpe / min-volatility problems for one universe size.
+
+    Expected returns and the covariance square root are cvxpy Parameters, so the
+    problems are canonicalized once and every window only updates parameter
+    values and re-solves. Solves start cold: a warm start from whichever
+    window this thread solved last would make the weights depend on that
+    history (serial vs pooled runs, fallbacks on iteration limits). The
+    formulation is the one EfficientFrontier uses with weight_bounds=(0, 1).
+    """
+
+    def __init__(self, n_assets: int, risk_free_rate: float = DEFAULT_RISK_FREE_RATE, solver: Optional[str] = None):
+        self.n_assets = n_assets
+        self.risk_free_rate = risk_free_rate
+        self.solver = solver
+
+        self._mu = cp.Parameter(n_assets)
+        self._make_risk_parameters()
+
+        # max Sharpe after the y = k * w substitution (Cornuejols and Tutuncu)
+        self._y = cp.Variable(n_assets)
+        self._k = cp.Variable()
+        self._max_sharpe = cp.Problem(
+            cp.Minimize(self._risk(self._y)),
+            [(self._mu - risk_free_rate) @ self._y == 1,
+             cp.sum(self._y) == self._k,
+             self._k >= 0,
+             self._y >= 0,
+             self._y <= self._k] + self._bounds(self._y, self._k),
+        )
+
+        self._w = cp.Variable(n_assets)
+        self._min_volatility = cp.Problem(
+            cp.Minimize(self._risk(self._w)),
+            [cp.sum(self._w) == 1, self._w >= 0, self._w <= 1] + self._bounds(self._w, 1),
+        )
+
+    def _make_risk_parameters(self):
+        self._cov_sqrt = cp.Parameter((self.n_assets, self.n_assets))
+
+    def _bounds(self, x: cp.Variable, scale) -> list:
+        # extra upper bounds on x (y or w), ``scale`` is k for the max-Sharpe problem
+        return []
+
+    def _risk(self, x: cp.Variable) -> cp.Expression:
+        return cp.sum_squares(self._cov_sqrt @ x)
+
+    def _set_risk(self, cov):
+        self._cov_sqrt.value = _cov_sqrt(np.asarray(cov, dtype=np.float64))
+
+    def _solve(self, problem: cp.Problem) -> bool:
+        try:
+            problem.solve(solver=self.solver, warm_start=False)
+        except cp.SolverError:
+            return False
+        return problem.status in {"optimal", "optimal_inaccurate"}
+
+    def weights(self, mu, cov) -> np.ndarray:
+        """Max-Sharpe weights, falling back to min-volatility like ``__get_mvo_weights``."""
+        mu = np.asarray(mu, dtype=np.float64)
+        self._mu.value = mu
+        self._set_risk(cov)
+
+        if mu.max() <= self.risk_free_rate:
+            telemetry.inc("optimizer_fallbacks_total", {"reason": "no_excess_return"})
+        elif self._solve(self._max_sharpe):
+            return (self._y.value / self._k.value).round(16) + 0.0
+        else:
+            telemetry.inc("optimizer_fallbacks_total", {"reason": f"max_sharpe_{self._max_sharpe.status or 'solver_error'}"})
+
+        if not self._solve(self._min_volatility):
+            raise ValueError(f"min_volatility failed: solver status {self._min_volatility.status}")
+        return self._w.value.round(16) + 0.0
+
+
+class FactorMVOEngine(MVOEngine):
+    """
+    MVOEngine for a ``LowRankCovariance``: the risk term is
+    ||loadings.T w||^2 + ||sqrt(specific) * w||^2, so problem size and solve
+    time grow with n * rank instead of n^2 and no n x n matrix is factored.
+
+    ``n_assets`` and ``rank`` are capacities: smaller problems are padded with
+    assets bounded to weight 0 and zero factor loadings, so one compiled
+    engine serves the windows of a universe whose size changes over time.
+    """
+
+    def __init__(self, n_assets: int, rank: int, risk_free_rate: float = DEFAULT_RISK_FREE_RATE, solver: Optional[str] = None):
+        self.rank = rank
+        super().__init__(n_assets, risk_free_rate, solver)
+
+    def _make_risk_parameters(self):
+        self._loadings = cp.Parameter((self.n_assets, self.rank))
+        self._specific_sqrt = cp.Parameter(self.n_assets, nonneg=True)
+        self._active = cp.Parameter(self.n_assets, nonneg=True)
+
+    def _bounds(self, x: cp.Variable, scale) -> list:
+        return [x <= cp.multiply(self._active, scale)]
+
+    def _risk(self, x: cp.Variable) -> cp.Expression:
+        return cp.sum_squares(self._loadings.T @ x) + cp.sum_squares(cp.multiply(self._specific_sqrt, x))
+
+    def _set_risk(self, cov: LowRankCovariance):
+        n, rank = cov.loadings.shape
+        loadings = np.zeros((self.n_assets, self.rank))
+        loadings[:n, :rank] = cov.loadings
+        specific = np.ones(self.n_assets)
+        specific[:n] = cov.specific
+        self._loadings.value = loadings
+        self._specific_sqrt.value = np.sqrt(specific)
+        self._active.value = (np.arange(self.n_assets) < n).astype(np.float64)
+
+    def weights(self, mu, cov: LowRankCovariance) -> np.ndarray:
+        mu = np.asarray(mu, dtype=np.float64)
+        n = len(mu)
+        if n > self.n_assets or cov.rank > self.rank:
+            raise ValueError(f"{n} assets / rank {cov.rank} exceed the engine's {self.n_assets} / {self.rank}")
+        # padded assets have no excess return, they never change the no_excess_return check
+        padded = np.full(self.n_assets, self.risk_free_rate)
+        padded[:n] = mu
+        return super().weights(padded, cov)[:n]
+
+
+_engines = threading.local()
+
+
+def _get_engine(key: tuple, factory) -> MVOEngine:
+    # one engine per thread since parameter values are shared state
+    engines = getattr(_engines, 'engines', None)
+    if engines is None:
+        engines = _engines.engines = OrderedDict()
+    if key in engines:
+        engines.move_to_end(key)
+        return engines[key]
+    engine = engines[key] = factory()
+    while len(engines) > MVO_ENGINE_CACHE:
+        engines.popitem(last=False)
+    return engine
+
+
+def _round_up(value: int, step: int) -> int:
+    return max(step, -(-value // step) * step)
+
+
+def get_mvo_engine(n_assets: int) -> MVOEngine:
+    return _get_engine(('dense', n_assets), lambda: MVOEngine(n_assets))
+
+
+def get_factor_mvo_engine(n_assets: int, rank: int) -> FactorMVOEngine:
+    """An engine with room for ``n_assets`` and ``rank``, shared by nearby sizes."""
+    n_assets, rank = _round_up(n_assets, FACTOR_ASSET_STEP), _round_up(rank, FACTOR_RANK_STEP)
+    return _get_engine(('factor', n_assets, rank), lambda: FactorMVOEngine(n_assets, rank))
+
+
+def mvo_weights(mu: pd.Series, cov: pd.DataFrame) -> pd.Series:
+    weights = get_mvo_engine(len(mu)).weights(mu.values, cov.values)
+    return pd.Series(weights, index=mu.index).astype(float)
+
+
+def factor_mvo_weights(mu: pd.Series, cov: LowRankCovariance) -> pd.Series:
+    weights = get_factor_mvo_engine(len(mu), cov.rank).weights(mu.values, cov)
+    return pd.Series(weights, index=mu.index).astype(float)
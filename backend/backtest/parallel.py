@@ -0,0 +1,117 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WORKERS = int(os.getenv("BACKTEST_WORKERS", "1"))
+
+_executors: dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+# worker side: shared price matrices attached by segment name
+_attached: "OrderedDict[str, tuple[shared_memory.SharedMemory, np.ndarray]]" = OrderedDict()
+_MAX_ATTACHED = 4
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by all backtests that ask for the same worker count."""
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            # spawn: the API process runs threads, forking it is not safe
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executors[workers] = executor
+        return executor
+
+
+@atexit.register
+def shutdown_executors():
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
+
+
+def _attach(name: str, shape: tuple) -> np.ndarray:
+    if name in _attached:
+        _attached.move_to_end(name)
+        return _attached[name][1]
+    shm = shared_memory.SharedMemory(name=name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _attached[name] = (shm, values)
+    while len(_attached) > _MAX_ATTACHED:
+        _, (old_shm, _) = _attached.popitem(last=False)
+        old_shm.close()
+    return values
+
+
+def _solve_window(task):
+    from backend.backtest.pfopt import PfOptBacktest
+
+    name, shape, columns, start, end, method = task
+    values = _attach(name, shape)
+    window = pd.DataFrame(values[start:end], columns=columns)
+    return PfOptBacktest._get_weight(window, method)
+
+
+def _solve_moments(task):
+    from backend.backtest.pfopt import PfOptBacktest
+
+    mu, cov, method = task
+    return PfOptBacktest._get_weight_from_moments(mu, cov, method)
+
+
+def collect(results, total: int, progress: Optional[Callable[[int, int], None]] = None) -> list:
+    """
+    ``list(results)``, calling ``progress(done, total)`` after every item. An
+    exception raised by ``progress`` propagates, and abandoning a pool's map
+    iterator cancels the tasks not started yet.
+    """
+    if progress is None:
+        return list(results)
+    collected = []
+    for result in results:
+        collected.append(result)
+        progress(len(collected), total)
+    return collected
+
+
+def solve_windows_parallel(price_df: pd.DataFrame,
+                           windows: list[tuple[int, int]],
+                           method: Literal['mvo', 'hrp'] = 'mvo',
+                           workers: int = DEFAULT_WORKERS,
+                           progress: Optional[Callable[[int, int], None]] = None) -> list[pd.Series]:
+    """
+    Optimize ``price_df.iloc[start:end]`` for every ``(start, end)`` on a process pool.
+
+    The price matrix is placed in shared memory once and workers read their
+    windows from it without copying. Results keep the order of ``windows``.
+    """
+    values = np.ascontiguousarray(price_df.values, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+        columns = list(price_df.columns)
+        tasks = [(shm.name, values.shape, columns, start, end, method) for start, end in windows]
+        chunksize = max(1, len(tasks) // (workers * 4))
+        return collect(get_executor(workers).map(_solve_window, tasks, chunksize=chunksize), len(tasks), progress)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def solve_moments_parallel(moments: list[tuple[pd.Series, pd.DataFrame]],
+                           method: Literal['mvo', 'hrp'] = 'mvo',
+                           workers: int = DEFAULT_WORKERS,
+                           progress: Optional[Callable[[int, int], None]] = None) -> list[pd.Series]:
+    """Optimize precomputed ``(mu, cov)`` pairs on a process pool, results in input order."""
+    tasks = [(mu, cov, method) for mu, cov in moments]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    return collect(get_executor(workers).map(_solve_moments, tasks, chunksize=chunksize), len(tasks), progress)
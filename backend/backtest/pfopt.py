@@ -1,7 +1,12 @@
 import pandas as pd
-import numpy as np
-from typing import Literal
-from pypfopt import EfficientFrontier, risk_models, expected_returns, HRPOpt
+from typing import Callable, Literal, Optional
+from pypfopt import risk_models, expected_returns
+from backend.backtest.rolling import iter_rolling_windows
+from backend.backtest.mvo import mvo_weights
+from backend.backtest.hrp import hrp_weight_series, hrp_weights_from_cov
+from backend.backtest.metrics import compute_performance_metrics
+from backend.backtest.parallel import solve_windows_parallel, solve_moments_parallel, collect
+from backend import telemetry
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -10,9 +15,11 @@ def _clip_and_normalize(df:pd.DataFrame):
     normalized = clipped.div(clipped.sum(axis=1), axis=0)
     return normalized
 
-def _compute_equity_curve(price_df:pd.DataFrame, weight_history_df:pd.DataFrame, transaction_cost=0.001):
+@telemetry.timed("equity")
+def _compute_equity_curve(price_df:pd.DataFrame, weight_history_df:pd.DataFrame, transaction_cost=0.001, returns=None):
 
-    returns = price_df.pct_change().fillna(0)
+    if returns is None:
+        returns = price_df.pct_change().fillna(0)
     weights = weight_history_df.reindex(returns.index, method='ffill')
     port_returns = (weights.shift() * returns).sum(axis=1)
     turnover = weights.diff().abs().sum(axis=1)
@@ -21,62 +28,35 @@ def _compute_equity_curve(price_df:pd.DataFrame, weight_history_df:pd.DataFrame,
 
     return equity_curve
 
-def _compute_performance_metrics(equity_curve, time):
-    equity_curve = np.asarray(equity_curve)
-    time = np.asarray(time)/1000
-    
-    # Return
-    total_return = equity_curve[-1] / equity_curve[0] - 1
+def _extend_equity_curve(price_df:pd.DataFrame, weight_history_df:pd.DataFrame, equity_curve:pd.Series, transaction_cost=0.001):
+    # continue a _compute_equity_curve result over the bars appended to price_df
+    start = price_df.index.get_loc(equity_curve.index[-1])
+    if start == len(price_df) - 1:
+        return equity_curve
+    tail = _compute_equity_curve(price_df.iloc[start:], weight_history_df, transaction_cost)
+    return pd.concat([equity_curve, equity_curve.iloc[-1] * tail.iloc[1:]])
 
-    # Log returns
-    log_returns = np.diff(np.log(equity_curve))
-    
-    # Time delta for frequency normalization
-    time_deltas = np.diff(time)
-    avg_seconds = np.mean(time_deltas)
-    freq_per_year = 365 * 24 * 3600 / avg_seconds  # approximate annualization
-
-    # Sharpe ratio (annualized)
-    excess_returns = log_returns * avg_seconds / (365 * 24 * 3600)
-    sharpe_ratio = np.mean(excess_returns) / np.std(excess_returns, ddof=1) * np.sqrt(freq_per_year)
-
-    # Drawdown
-    peak = np.maximum.accumulate(equity_curve)
-    drawdown = equity_curve / peak - 1
-    max_drawdown = np.min(drawdown)
-
-    # Max drawdown duration
-    peak_idx = 0
-    max_duration = 0
-    current_duration = 0
-    for i in range(1, len(equity_curve)):
-        if equity_curve[i] >= peak[peak_idx]:
-            peak_idx = i
-            current_duration = 0
-        else:
-            current_duration = time[i] - time[peak_idx]
-            max_duration = max(max_duration, current_duration)
-
-    # Profit factor
-    pnl = np.diff(equity_curve)
-    gross_profit = np.sum(pnl[pnl > 0])
-    gross_loss = -np.sum(pnl[pnl < 0])
-    profit_factor = gross_profit / gross_loss if gross_loss != 0 else np.inf
-
-    return {
-        'Total Return': total_return,
-        'Sharpe Ratio': sharpe_ratio,
-        'Max Drawdown': max_drawdown,
-        'Max Drawdown Duration (day)': max_duration/86400,
-        'Profit Factor': profit_factor
-    }
+def _rebase_equity_curve(equity_curve:pd.Series, start):
+    # equity from the first rebalance date on, starting at 1
+    equity_curve = equity_curve.loc[start:]
+    return (equity_curve / equity_curve.iloc[0]).values
+
+@telemetry.timed("metrics")
+def _compute_performance_metrics(equity_curve, time):
+    # one vectorized pass, see PerformanceAccumulator for the streaming version
+    return compute_performance_metrics(equity_curve, time)
 
 class PfOptBacktest:
 
-    def __init__(self, price_df: pd.DataFrame, lookback_days: int, rebalance_days:int):
+    def __init__(self, price_df: pd.DataFrame, lookback_days: int, rebalance_days:int, workers:int = 1,
+                 progress: Optional[Callable[[int, int], None]] = None):
         self.price_df = price_df
         self.lookback_days = lookback_days
         self.rebalance_days = rebalance_days
+        # workers > 1 solves the rebalance windows on a process pool
+        self.workers = workers
+        # progress(solved, total) after every rebalance window; raising from it aborts the run
+        self.progress = progress
     
     @staticmethod
     def _get_weight(prices_window:pd.DataFrame, method: Literal['mvo','hrp'] = 'mvo'):
@@ -89,28 +69,93 @@ class PfOptBacktest:
         
         return weight
     
-    def get_weight_history(self, method: Literal['mvo','hrp'] = 'mvo'):
-        dates = []
-        weights_list = []
-        for i in range(self.lookback_days, len(self.price_df), self.rebalance_days):
-            window = self.price_df.iloc[i - self.lookback_days:i]
-
-            date = self.price_df.index[i]
-            weights = PfOptBacktest._get_weight(window, method)
-            weights_list.append(weights)
-            dates.append(date)
+    @staticmethod
+    def _get_weight_from_moments(mu:pd.Series, cov:pd.DataFrame, method: Literal['mvo','hrp'] = 'mvo', corr:pd.DataFrame = None):
+        if method == 'mvo':
+            weight = PfOptBacktest.__get_mvo_weights_from_moments(mu, cov)
+        elif method == 'hrp':
+            weight = PfOptBacktest.__get_hrp_weights_from_cov(cov, corr)
+        else:
+            raise NotImplementedError(f'{method} not implemented, try: "mvo","hrp"')
+
+        return weight
+
+    def _rebalance_points(self):
+        return list(range(self.lookback_days, len(self.price_df), self.rebalance_days))
+
+    def _iter_rolling_moments(self, points, method: Literal['mvo','hrp'] = 'mvo', skip: int = 0):
+        # the first ``skip`` windows are only rolled over, not yielded
+        columns = self.price_df.columns
+        if method == 'mvo':
+            # window i uses the returns of price rows [i - lookback, i)
+            data = self.price_df.pct_change().values
+            starts = [i - self.lookback_days + 1 for i in points]
+        else:
+            # HRP is fed the price window itself (as HRPOpt(prices) was), keep the same statistics
+            data = self.price_df.values
+            starts = [i - self.lookback_days for i in points]
+
+        for k, moments in iter_rolling_windows(data, starts, points, track_log_growth=(method == 'mvo')):
+            if k < skip:
+                continue
+            cov = moments.cov()
+            if method == 'mvo':
+                mu = pd.Series(moments.compounded_mean(), index=columns)
+                cov = risk_models.fix_nonpositive_semidefinite(pd.DataFrame(cov * 252, index=columns, columns=columns))
+            else:
+                mu = None
+                cov = pd.DataFrame(cov, index=columns, columns=columns)
+            yield mu, cov
+
+    @telemetry.timed("optimize")
+    def _get_weight_history(self, points, method: Literal['mvo','hrp'] = 'mvo', stats: Literal['window','rolling'] = 'window',
+                            skip: int = 0):
+        # solves points[skip:]; the rolling moments still run over all points, so rounding matches a full run
+        rolled, points = points, points[skip:]
+        dates = [self.price_df.index[i] for i in points]
+        telemetry.inc("optimizer_windows_total", {"method": method, "stats": stats}, len(points))
+        if stats == 'rolling':
+            moments = self._iter_rolling_moments(rolled, method, skip)
+            if self.workers > 1:
+                weights_list = solve_moments_parallel(list(moments), method, self.workers, self.progress)
+            else:
+                weights = (PfOptBacktest._get_weight_from_moments(mu, cov, method) for mu, cov in moments)
+                weights_list = collect(weights, len(points), self.progress)
+        elif stats == 'window':
+            windows = [(i - self.lookback_days, i) for i in points]
+            if self.workers > 1:
+                weights_list = solve_windows_parallel(self.price_df, windows, method, self.workers, self.progress)
+            else:
+                weights = (PfOptBacktest._get_weight(self.price_df.iloc[start:end], method) for start, end in windows)
+                weights_list = collect(weights, len(points), self.progress)
+        else:
+            raise NotImplementedError(f'{stats} not implemented, try: "window","rolling"')
         weight_history_df = pd.DataFrame(weights_list, index = dates, columns = self.price_df.columns)
         return _clip_and_normalize(weight_history_df)
-    
-    def run(self, method: Literal['mvo','hrp'] = 'mvo'):
-        weight_history_df = self.get_weight_history(method)
+
+    def get_weight_history(self, method: Literal['mvo','hrp'] = 'mvo', stats: Literal['window','rolling'] = 'window'):
+        return self._get_weight_history(self._rebalance_points(), method, stats)
+
+    def extend_weight_history(self, weight_history_df:pd.DataFrame, method: Literal['mvo','hrp'] = 'mvo', stats: Literal['window','rolling'] = 'window'):
+        """
+        Append the rebalance windows after ``weight_history_df.index[-1]``.
+
+        ``weight_history_df`` must come from a backtest of a prefix of
+        ``self.price_df`` with the same lookback and rebalance, so its
+        rebalance dates are the first ones of this backtest.
+        """
+        last_position = self.price_df.index.get_loc(weight_history_df.index[-1])
+        points = self._rebalance_points()
+        skip = sum(1 for i in points if i <= last_position)
+        if skip == len(points):
+            return weight_history_df
+        new_weights = self._get_weight_history(points, method, stats, skip)
+        return pd.concat([weight_history_df, new_weights])
+
+    def run(self, method: Literal['mvo','hrp'] = 'mvo', stats: Literal['window','rolling'] = 'window'):
+        weight_history_df = self.get_weight_history(method, stats)
         equity_curve = _compute_equity_curve(self.price_df, weight_history_df)
-        price_df = self.price_df.copy()
-        price_df['equity_curve'] = equity_curve
-        price_df = price_df.loc[weight_history_df.index[0]:]
-        price_df = price_df/price_df.iloc[0]
-        equity_curve = price_df['equity_curve'].values
-        return equity_curve
+        return _rebase_equity_curve(equity_curve, weight_history_df.index[0])
         
 
 
@@ -118,15 +163,20 @@ class PfOptBacktest:
     def __get_mvo_weights(prices_window:pd.DataFrame):
         mu = expected_returns.mean_historical_return(prices_window)
         cov = risk_models.sample_cov(prices_window)
-        ef = EfficientFrontier(mu, cov, weight_bounds=(0, 1))
-        try:
-            weights = ef.max_sharpe()
-        except:
-            weights = ef.min_volatility()
-        return pd.Series(weights).astype(float)
+        return PfOptBacktest.__get_mvo_weights_from_moments(mu, cov)
+
+    @staticmethod
+    def __get_mvo_weights_from_moments(mu:pd.Series, cov:pd.DataFrame):
+        # compiled once per universe size, each window solved from a cold start,
+        # same max_sharpe -> min_volatility fallback as EfficientFrontier
+        return mvo_weights(mu, cov)
     
     @staticmethod
     def __get_hrp_weights(prices_window:pd.DataFrame):
-        hrp = HRPOpt(prices_window)
-        weights = hrp.optimize()
-        return pd.Series(weights).astype(float)
+        # NumPy HRP, same weights as HRPOpt(prices_window).optimize()
+        return hrp_weight_series(prices_window)
+
+    @staticmethod
+    def __get_hrp_weights_from_cov(cov:pd.DataFrame, corr:pd.DataFrame = None):
+        weights = hrp_weights_from_cov(cov.values, None if corr is None else corr.values)
+        return pd.Series(weights, index=cov.columns)
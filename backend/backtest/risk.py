@@ -0,0 +1,91 @@
+"""
+Covariance estimators for large universes, kept in factored form.
+
+With a 90-bar lookback and hundreds of assets the sample covariance is rank
+deficient and its inverse meaningless. Both estimators here return
+``loadings @ loadings.T + diag(specific)`` with a strictly positive diagonal
+part: a rank k <= T - 1 matrix plus a diagonal, O(n k) numbers instead of
+O(n^2), which the optimizers in backend.backtest.mvo use as is.
+"""
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+DEFAULT_FACTORS = 10
+
+# diagonal floor relative to the average variance, keeps flat assets (stablecoins) invertible
+_SPECIFIC_FLOOR = 1e-6
+
+
+@dataclass
+class LowRankCovariance:
+    """Covariance ``loadings @ loadings.T + diag(specific)``."""
+    loadings: np.ndarray    # (n, k)
+    specific: np.ndarray    # (n,), > 0
+
+    @property
+    def rank(self) -> int:
+        return self.loadings.shape[1]
+
+    def scaled(self, factor: float) -> "LowRankCovariance":
+        return LowRankCovariance(self.loadings * np.sqrt(factor), self.specific * factor)
+
+    def variances(self) -> np.ndarray:
+        return np.einsum('ik,ik->i', self.loadings, self.loadings) + self.specific
+
+    def dense(self) -> np.ndarray:
+        return self.loadings @ self.loadings.T + np.diag(self.specific)
+
+
+def _floor(specific: np.ndarray, variances: np.ndarray) -> np.ndarray:
+    floor = _SPECIFIC_FLOOR * max(float(variances.mean()), np.finfo(np.float64).tiny)
+    return np.maximum(specific, floor)
+
+
+def shrinkage_covariance(returns: np.ndarray) -> LowRankCovariance:
+    """
+    Ledoit-Wolf shrinkage of the (maximum likelihood) sample covariance towards
+    a scaled identity, as sklearn.covariance.LedoitWolf. Every term comes from
+    the T x T Gram matrix, so the n x n sample covariance is never formed.
+    """
+    x = returns - returns.mean(axis=0)
+    n_obs, n_assets = x.shape
+    gram = x @ x.T
+    mu = np.trace(gram) / n_obs / n_assets
+    s_norm2 = np.sum(gram ** 2) / n_obs ** 2
+    delta = (s_norm2 - n_assets * mu ** 2) / n_assets
+    beta = (np.sum(np.diag(gram) ** 2) - n_obs * s_norm2) / n_obs ** 2 / n_assets
+    shrinkage = 0.0 if delta <= 0 else min(beta, delta) / delta
+
+    _, s, vt = np.linalg.svd(x, full_matrices=False)
+    keep = s > s[0] * 1e-12 if len(s) else s > 0
+    loadings = vt[keep].T * (s[keep] * np.sqrt((1 - shrinkage) / n_obs))
+    specific = np.full(n_assets, shrinkage * mu)
+    variances = np.einsum('ij,ij->j', x, x) / n_obs
+    return LowRankCovariance(loadings, _floor(specific, variances))
+
+
+def factor_covariance(returns: np.ndarray, n_factors: int = DEFAULT_FACTORS) -> LowRankCovariance:
+    """
+    Statistical factor model: the top ``n_factors`` principal components of the
+    sample covariance plus the residual variance of every asset.
+    """
+    x = returns - returns.mean(axis=0)
+    n_obs = len(x)
+    variances = np.einsum('ij,ij->j', x, x) / max(n_obs - 1, 1)
+    _, s, vt = np.linalg.svd(x, full_matrices=False)
+    k = max(0, min(n_factors, len(s) - 1))
+    loadings = vt[:k].T * (s[:k] / np.sqrt(max(n_obs - 1, 1)))
+    specific = variances - np.einsum('ik,ik->i', loadings, loadings)
+    return LowRankCovariance(loadings, _floor(specific, variances))
+
+
+def estimate_covariance(returns: np.ndarray,
+                        risk_model: Literal['shrinkage', 'factor'] = 'shrinkage',
+                        n_factors: int = DEFAULT_FACTORS) -> LowRankCovariance:
+    if risk_model == 'shrinkage':
+        return shrinkage_covariance(returns)
+    if risk_model == 'factor':
+        return factor_covariance(returns, n_factors)
+    raise NotImplementedError(f'{risk_model} not implemented, try: "shrinkage","factor"')
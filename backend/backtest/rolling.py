@@ -0,0 +1,92 @@
+import numpy as np
+from typing import Iterator
+
+
+class RollingMoments:
+    """
+    Running first and second moments of a sliding window of rows.
+
+    Rows entering the window are added and rows leaving it are removed, so
+    moving the window by ``k`` rows costs O(k * n^2) instead of recomputing
+    O(lookback * n^2) from scratch. Data is shifted by the first row seen to
+    keep the cross-product sums well conditioned.
+    """
+
+    def __init__(self, n_cols: int, track_log_growth: bool = False):
+        self.n_cols = n_cols
+        self.track_log_growth = track_log_growth
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self._shift = None
+        self._sum = np.zeros(self.n_cols)
+        self._cross = np.zeros((self.n_cols, self.n_cols))
+        self._log_growth = np.zeros(self.n_cols)
+
+    def _update(self, rows: np.ndarray, sign: int):
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if len(rows) == 0:
+            return
+        if self._shift is None:
+            self._shift = rows[0].copy()
+        shifted = rows - self._shift
+        self.count += sign * len(rows)
+        self._sum += sign * shifted.sum(axis=0)
+        self._cross += sign * (shifted.T @ shifted)
+        if self.track_log_growth:
+            self._log_growth += sign * np.log1p(rows).sum(axis=0)
+
+    def add(self, rows: np.ndarray):
+        self._update(rows, 1)
+
+    def remove(self, rows: np.ndarray):
+        self._update(rows, -1)
+
+    def mean(self) -> np.ndarray:
+        return self._shift + self._sum / self.count
+
+    def cov(self, ddof: int = 1) -> np.ndarray:
+        centered_mean = self._sum / self.count
+        cov = (self._cross - self.count * np.outer(centered_mean, centered_mean)) / (self.count - ddof)
+        return (cov + cov.T) / 2
+
+    def corr(self) -> np.ndarray:
+        cov = self.cov()
+        std = np.sqrt(np.diag(cov))
+        corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def compounded_mean(self, frequency: int = 252) -> np.ndarray:
+        """Annualised geometric mean of return rows, as ``expected_returns.mean_historical_return``."""
+        if not self.track_log_growth:
+            raise ValueError("RollingMoments was created without track_log_growth")
+        return np.expm1(self._log_growth * frequency / self.count)
+
+
+def iter_rolling_windows(data: np.ndarray,
+                         starts: list[int],
+                         ends: list[int],
+                         track_log_growth: bool = False) -> Iterator[tuple[int, RollingMoments]]:
+    """
+    Yield ``(k, moments)`` with ``moments`` covering ``data[starts[k]:ends[k]]``.
+
+    Windows must move forward. Overlapping rows are carried over; the moments
+    are rebuilt from scratch when consecutive windows do not overlap, and once
+    the window has fully turned over so rounding errors cannot accumulate.
+    """
+    moments = RollingMoments(data.shape[1], track_log_growth)
+    prev_start, prev_end = 0, 0
+    moved = 0
+    for k, (start, end) in enumerate(zip(starts, ends)):
+        moved += end - prev_end
+        if start >= prev_end or start < prev_start or end < prev_end or moved >= end - start:
+            moments.reset()
+            moments.add(data[start:end])
+            moved = 0
+        else:
+            moments.remove(data[prev_start:start])
+            moments.add(data[prev_end:end])
+        prev_start, prev_end = start, end
+        yield k, moments
@@ -0,0 +1,126 @@
+import os
+import itertools
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.backtest.pfopt import (
+    PfOptBacktest,
+    _clip_and_normalize,
+    _compute_equity_curve,
+    _compute_performance_metrics,
+    _rebase_equity_curve,
+)
+from backend.backtest.parallel import solve_windows_parallel
+
+# every combination is a full backtest, keep one sweep request bounded
+MAX_COMBINATIONS = int(os.getenv("SWEEP_MAX_COMBINATIONS", "200"))
+
+
+def parse_grid(spec: str) -> list[int]:
+    """
+    Parse a parameter grid: ``"30,60,90"`` or an inclusive range ``"30:90:30"``.
+    Both forms can be mixed, e.g. ``"7,30:90:30"``.
+    """
+    values = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part:
+            bounds = [int(x) for x in part.split(":")]
+            start, stop = bounds[0], bounds[1]
+            step = bounds[2] if len(bounds) > 2 else 1
+            if step <= 0:
+                raise ValueError(f"range step must be positive: {part}")
+            if len(range(start, stop + 1, step)) > MAX_COMBINATIONS:
+                raise ValueError(f"range {part} has more than {MAX_COMBINATIONS} values")
+            values.extend(range(start, stop + 1, step))
+        else:
+            values.append(int(part))
+    return sorted(set(values))
+
+
+def _rebalance_points(n_rows: int, lookback: int, rebalance: int) -> list[int]:
+    return list(range(lookback, n_rows, rebalance))
+
+
+def _combination_error(lookback: int, rebalance: int) -> Optional[str]:
+    if lookback < 2:
+        return 'lookback must be at least 2'
+    if rebalance < 1:
+        return 'rebalance must be at least 1'
+    return None
+
+
+def run_sweep(price_df: pd.DataFrame,
+              lookbacks: list[int],
+              rebalances: list[int],
+              algorithms: list[Literal['mvo', 'hrp']],
+              workers: int = 1) -> pd.DataFrame:
+    """
+    Backtest every (lookback, rebalance, algorithm) combination on one price panel.
+
+    Returns are computed once, and a rebalance window shared by several
+    combinations (same lookback, algorithm and end row) is optimized only once.
+    Returns one row of performance metrics per combination; a combination
+    that cannot be backtested gets an ``error`` instead.
+    """
+    n_combinations = len(lookbacks) * len(rebalances) * len(algorithms)
+    if n_combinations > MAX_COMBINATIONS:
+        raise ValueError(f"{n_combinations} combinations, at most {MAX_COMBINATIONS} per sweep")
+    n_rows = len(price_df)
+    returns = price_df.pct_change().fillna(0)
+
+    # unique windows per (lookback, algorithm), across all rebalance intervals
+    solved = {}
+    failed = {}
+    for lookback, algorithm in itertools.product(lookbacks, algorithms):
+        points = sorted(set(itertools.chain.from_iterable(
+            _rebalance_points(n_rows, lookback, rebalance) for rebalance in rebalances
+            if _combination_error(lookback, rebalance) is None)))
+        if not points:
+            continue
+        windows = [(i - lookback, i) for i in points]
+        try:
+            if workers > 1:
+                weights = solve_windows_parallel(price_df, windows, algorithm, workers)
+            else:
+                weights = [PfOptBacktest._get_weight(price_df.iloc[start:end], algorithm) for start, end in windows]
+        except Exception as e:
+            failed[(lookback, algorithm)] = str(e)
+            continue
+        solved.update({(lookback, algorithm, i): w for i, w in zip(points, weights)})
+
+    rows = []
+    for lookback, rebalance, algorithm in itertools.product(lookbacks, rebalances, algorithms):
+        row = {'lookback': lookback, 'rebalance': rebalance, 'algorithm': algorithm}
+        error = _combination_error(lookback, rebalance) or failed.get((lookback, algorithm))
+        points = [] if error else _rebalance_points(n_rows, lookback, rebalance)
+        if not error and not points:
+            error = 'not enough data for this lookback'
+        if error:
+            row['error'] = error
+            rows.append(row)
+            continue
+
+        try:
+            weight_history_df = pd.DataFrame([solved[(lookback, algorithm, i)] for i in points],
+                                             index=price_df.index[points], columns=price_df.columns)
+            weight_history_df = _clip_and_normalize(weight_history_df)
+            equity_curve = _compute_equity_curve(price_df, weight_history_df, returns=returns)
+            equity_curve = _rebase_equity_curve(equity_curve, weight_history_df.index[0])
+            time = price_df.index.to_list()[-len(equity_curve):]
+            row.update(_compute_performance_metrics(equity_curve, time))
+        except Exception as e:
+            row['error'] = str(e)
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def sweep_to_records(results: pd.DataFrame) -> list[dict]:
+    # JSON has no inf/nan
+    clean = results.replace([np.inf, -np.inf], np.nan)
+    return clean.astype(object).where(clean.notna(), None).to_dict(orient='records')
@@ -0,0 +1,130 @@
+"""
+Backtests over hundreds of tokens.
+
+Prices come outer-joined (NaN before a token's first candle). Every rebalance
+window is solved over the tokens with a full lookback of prices that moved in
+it, the others get weight 0. A window with a single such token puts all the
+weight on it, one with none is skipped (the previous weights are held).
+Covariances are the factored estimates of backend.backtest.risk: MVO solves
+them with FactorMVOEngine, HRP clusters their dense (but well-conditioned) form.
+
+These are covariances of returns. PfOptBacktest's HRP clusters the covariance
+of the price window itself (as HRPOpt(prices) does), so HRP weights of the two
+backtests are not comparable, even on the same tokens.
+"""
+from typing import Callable, Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.backtest.risk import DEFAULT_FACTORS, estimate_covariance
+from backend.backtest.mvo import factor_mvo_weights
+from backend.backtest.hrp import hrp_weights_from_cov
+from backend.backtest.pfopt import _clip_and_normalize, _compute_equity_curve, _rebase_equity_curve
+from backend.backtest.parallel import collect
+from backend import telemetry
+
+TRADING_DAYS = 252
+
+
+class LargeUniverseBacktest:
+    """
+    Same interface as PfOptBacktest for the weight history; ``stats`` is always
+    'window'. HRP clusters the returns covariance, not the price covariance
+    PfOptBacktest's HRP uses.
+    """
+
+    def __init__(self, price_df: pd.DataFrame, lookback_days: int, rebalance_days: int,
+                 risk_model: Literal['shrinkage', 'factor'] = 'shrinkage',
+                 n_factors: int = DEFAULT_FACTORS,
+                 min_assets: int = 2,
+                 progress: Optional[Callable[[int, int], None]] = None):
+        self.price_df = price_df
+        self.lookback_days = lookback_days
+        self.rebalance_days = rebalance_days
+        self.risk_model = risk_model
+        self.n_factors = n_factors
+        self.min_assets = min_assets
+        self.progress = progress
+        values = price_df.values
+        valid = ~np.isnan(values)
+        self._starts = np.where(valid.any(axis=0), valid.argmax(axis=0), len(price_df))
+        # _moves[i, j]: price changes of token j over rows [1, i], a window [start, end)
+        # moved iff _moves[end - 1] > _moves[start]
+        changed = np.zeros(values.shape, dtype=np.int32)
+        changed[1:] = (values[1:] != values[:-1]) & valid[1:] & valid[:-1]
+        self._moves = np.cumsum(changed, axis=0)
+
+    def _window_tokens(self, end: int) -> np.ndarray:
+        start = end - self.lookback_days
+        eligible = np.flatnonzero(self._starts <= start)
+        # flat series (forward-filled after the last candle, pegged tokens) would look riskless
+        return eligible[self._moves[end - 1, eligible] > self._moves[start, eligible]]
+
+    def _rebalance_points(self):
+        # the first window needs min_assets tokens with a full lookback that moved in it
+        n_bars = len(self.price_df)
+        if n_bars <= self.lookback_days:
+            return []
+        ends = np.arange(self.lookback_days, n_bars)
+        starts = ends - self.lookback_days
+        eligible = self._starts[None, :] <= starts[:, None]
+        moving = self._moves[ends - 1] > self._moves[starts]
+        ready = np.flatnonzero((eligible & moving).sum(axis=1) >= self.min_assets)
+        if not len(ready):
+            return []
+        return list(range(int(ends[ready[0]]), n_bars, self.rebalance_days))
+
+    def _window_weights(self, end: int, method: Literal['mvo', 'hrp'] = 'mvo') -> Optional[np.ndarray]:
+        """Weights at ``end``, None when no token can be held."""
+        if method not in ('mvo', 'hrp'):
+            raise NotImplementedError(f'{method} not implemented, try: "mvo","hrp"')
+        eligible = self._window_tokens(end)
+        weights = np.zeros(self.price_df.shape[1])
+        if len(eligible) < 2:
+            # nothing to optimize (and both optimizers need two assets)
+            if not len(eligible):
+                return None
+            weights[eligible] = 1.0
+            return weights
+
+        start = end - self.lookback_days
+        prices = self.price_df.values[start:end, eligible]
+        returns = prices[1:] / prices[:-1] - 1
+        cov = estimate_covariance(returns, self.risk_model, self.n_factors).scaled(TRADING_DAYS)
+
+        if method == 'mvo':
+            # compounded mean return, as expected_returns.mean_historical_return
+            mu = (prices[-1] / prices[0]) ** (TRADING_DAYS / len(returns)) - 1
+            columns = self.price_df.columns[eligible]
+            weights[eligible] = factor_mvo_weights(pd.Series(mu, index=columns), cov).values
+        else:
+            weights[eligible] = hrp_weights_from_cov(cov.dense())
+        return weights
+
+    @telemetry.timed("optimize")
+    def _get_weight_history(self, points, method: Literal['mvo', 'hrp'] = 'mvo'):
+        telemetry.inc("optimizer_windows_total", {"method": method, "stats": self.risk_model}, len(points))
+        weights_list = collect((self._window_weights(i, method) for i in points), len(points), self.progress)
+        # skipped windows keep the previous weights through the forward fill of the equity curve
+        solved = [(i, weights) for i, weights in zip(points, weights_list) if weights is not None]
+        dates = [self.price_df.index[i] for i, _ in solved]
+        weights_list = [weights for _, weights in solved]
+        weight_history_df = pd.DataFrame(weights_list, index=dates, columns=self.price_df.columns)
+        return _clip_and_normalize(weight_history_df)
+
+    def get_weight_history(self, method: Literal['mvo', 'hrp'] = 'mvo', stats: Literal['window'] = 'window'):
+        return self._get_weight_history(self._rebalance_points(), method)
+
+    def extend_weight_history(self, weight_history_df: pd.DataFrame, method: Literal['mvo', 'hrp'] = 'mvo', stats: Literal['window'] = 'window'):
+        """Append the rebalance windows after ``weight_history_df.index[-1]``, see PfOptBacktest."""
+        last_position = self.price_df.index.get_loc(weight_history_df.index[-1])
+        points = [i for i in self._rebalance_points() if i > last_position]
+        if not points:
+            return weight_history_df
+        return pd.concat([weight_history_df, self._get_weight_history(points, method)])
+
+    def run(self, method: Literal['mvo', 'hrp'] = 'mvo'):
+        weight_history_df = self.get_weight_history(method)
+        equity_curve = _compute_equity_curve(self.price_df, weight_history_df)
+        return _rebase_equity_curve(equity_curve, weight_history_df.index[0])
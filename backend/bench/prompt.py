@@ -0,0 +1,74 @@
+"""
+Chat prompt size: the whole symbol table (one stuffed document) vs the
+top-k symbols retrieved for each question.
+
+    python -m backend.bench.prompt --k 5 20
+"""
+import time
+import argparse
+
+import pandas as pd
+
+from backend.oneinch.symbols import SYMBOL_CSV, SymbolIndex
+
+QUESTIONS = [
+    "Hi, I'm new to crypto. Where should I start?",
+    "Build me a portfolio of stablecoins",
+    "Compare UNI, AAVE and LINK over the last year",
+    "What is LDO and is it good for staking exposure?",
+    "I want some bitcoin on polygon",
+    "Backtest HRP on ETH, WBTC and MKR",
+    "any meme tokens like PEPE or SHIB?",
+    "uniswp vs sushi",
+]
+
+
+def _token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text)), "tiktoken o200k_base"
+    except Exception:
+        # no tokenizer installed: ~4 characters per token for English text
+        return lambda text: len(text) // 4, "chars / 4"
+
+
+def bench_prompt(ks: list[int]) -> tuple[pd.DataFrame, str]:
+    count_tokens, tokenizer = _token_counter()
+    full_context = str(pd.read_csv(SYMBOL_CSV)['symbol'].to_list())
+    full_tokens = count_tokens(full_context)
+
+    start = time.perf_counter()
+    index = SymbolIndex.from_files()
+    build_ms = 1000 * (time.perf_counter() - start)
+
+    rows = []
+    for k in ks:
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            context = index.context(question, k)
+            search_ms = 1000 * (time.perf_counter() - start)
+            rows.append({
+                'k': k,
+                'question': question[:40],
+                'full_tokens': full_tokens,
+                'topk_tokens': count_tokens(context),
+                'reduction': full_tokens / max(count_tokens(context), 1),
+                'search_ms': search_ms,
+                'matches': ",".join(info.symbol for info in index.search(question, min(k, 5))),
+            })
+    return pd.DataFrame(rows), f"tokenizer: {tokenizer}, index build: {build_ms:.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 20])
+    args = parser.parse_args()
+
+    results, note = bench_prompt(args.k)
+    print(note)
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Local stand-in for the 1inch endpoints the backend uses, serving synthetic
+candles from backend.bench.synthetic with a configurable latency.
+
+    python -m backend.bench.server --port 8001 --latency 0.05
+    ONEINCH_API_URL=http://127.0.0.1:8001 uvicorn backend.app.main:app
+
+Endpoints:
+    /token/v1.2/multi-chain                                 token list
+    /portfolio/integrations/prices/v1/time_range/cross_prices  candles, newest first
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from backend.bench.synthetic import synthetic_ohlc
+from backend.oneinch.store import GRANULARITY_SECONDS
+
+SYMBOL_CSV = "backend/oneinch/available_symbol.csv"
+
+
+class OneInchStandIn:
+    """
+    Threaded HTTP server mimicking the 1inch price and token-list API.
+
+    Every address of ``symbol_csv`` (and any other address, by hash) maps to
+    one asset of a correlated synthetic universe; each granularity has its own
+    ``n_bars``-long history ending at the current bar. Responses wait
+    ``latency`` seconds (plus up to ``jitter``) and fail with a 503 with
+    probability ``error_rate``.
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 n_bars: int = 1500,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 correlation: float = 0.3,
+                 seed: int = 0,
+                 symbol_csv: str = SYMBOL_CSV):
+        self.n_bars = n_bars
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.correlation = correlation
+        self.seed = seed
+        self.tokens = pd.read_csv(symbol_csv)
+        self._position = {addr.lower(): i for i, addr in enumerate(self.tokens['address'])}
+        self._universes: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _universe(self, granularity: str) -> list:
+        # one (n_bars, 5) array per asset, built once per granularity
+        with self._lock:
+            if granularity not in self._universes:
+                bar_seconds = GRANULARITY_SECONDS[granularity]
+                end = int(time.time()) // bar_seconds * bar_seconds
+                ohlc = synthetic_ohlc(len(self.tokens), self.n_bars, self.seed, correlation=self.correlation,
+                                      bar_seconds=bar_seconds, end=end)
+                self._universes[granularity] = [df.to_numpy() for df in ohlc.values()]
+            return self._universes[granularity]
+
+    def cross_prices(self, token_addr: str, granularity: str, limit: int) -> list[dict]:
+        universe = self._universe(granularity)
+        position = self._position.get(token_addr.lower())
+        if position is None:
+            position = int(token_addr.lower()[-8:], 16) % len(universe)
+        candles = universe[position][-limit:][::-1] if limit > 0 else universe[position][:0]
+        return [{'timestamp': int(t // 1000), 'open': o, 'high': h, 'low': l, 'close': c} for t, o, h, l, c in candles]
+
+    def multi_chain(self) -> list[dict]:
+        return [{'chainId': 1, 'address': addr, 'symbol': symbol, 'name': symbol, 'decimals': 18}
+                for symbol, addr in zip(self.tokens['symbol'], self.tokens['address'])]
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload=None):
+                body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with stand_in._lock:
+                    stand_in.requests += 1
+                delay = stand_in.latency + random.random() * stand_in.jitter
+                if delay > 0:
+                    time.sleep(delay)
+                if stand_in.error_rate and random.random() < stand_in.error_rate:
+                    return self._send(503, {"error": "stand-in failure"})
+
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    if url.path.endswith("/time_range/cross_prices"):
+                        return self._send(200, stand_in.cross_prices(query["token0_address"],
+                                                                     query.get("granularity", "day"),
+                                                                     int(query.get("limit", 1000))))
+                    if url.path.endswith("/token/v1.2/multi-chain"):
+                        return self._send(200, stand_in.multi_chain())
+                except (KeyError, ValueError) as e:
+                    return self._send(400, {"error": str(e)})
+                return self._send(404, {"error": f"{url.path} not found"})
+
+        return Handler
+
+    def start(self) -> "OneInchStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="oneinch-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--bars', type=int, default=1500)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per response')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--correlation', type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = OneInchStandIn(args.host, args.port, args.bars, args.latency, args.jitter, args.error_rate, args.correlation)
+    print(f"1inch stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Cold-start benchmark of the API process.
+
+Every run starts a fresh interpreter, imports backend.app.main and times the
+first request to a few endpoints. ``--report`` adds the import-time profile
+(python -X importtime) with the slowest modules by cumulative time.
+
+    python -m backend.bench.startup --runs 5 --report 20
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+import pandas as pd
+
+# run in a child process: nothing may be imported before the clock starts
+_COLD_START = r"""
+import json, time
+start = time.perf_counter()
+import backend.app.main as main
+timings = {'import_ms': 1000 * (time.perf_counter() - start)}
+
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+for name, method, url in [('survey', 'get', '/survey'),
+                          ('symbols', 'get', '/symbols?query=uni+aave'),
+                          ('chat', 'post', '/chat?user_input=hello')]:
+    start = time.perf_counter()
+    response = getattr(client, method)(url)
+    timings[f'first_{name}_ms'] = 1000 * (time.perf_counter() - start)
+    timings[f'{name}_status'] = response.status_code
+print(json.dumps(timings))
+"""
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault('LLM_BACKEND', 'fake')
+    env.setdefault('FAKE_LLM_SLEEP', '0')
+    env.setdefault('OPENAI_API_KEY', 'bench')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    return env
+
+
+def cold_start(runs: int) -> pd.DataFrame:
+    rows = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _COLD_START], env=_child_env(),
+                             capture_output=True, text=True, check=True)
+        rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return pd.DataFrame(rows)
+
+
+def import_profile(top: int) -> pd.DataFrame:
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import backend.app.main'],
+                         env=_child_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append({'module': module.strip(), 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    return pd.DataFrame(rows).sort_values('cumulative_ms', ascending=False).head(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--report', type=int, default=0, help='show the N slowest imports')
+    args = parser.parse_args()
+
+    results = cold_start(args.runs)
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.1f}"))
+    print()
+    print(results.filter(like='_ms').median().to_string(float_format=lambda x: f"{x:.1f}"))
+    if args.report:
+        print()
+        print(import_profile(args.report).to_string(index=False, float_format=lambda x: f"{x:.1f}"))
+
+
+if __name__ == '__main__':
+    main()
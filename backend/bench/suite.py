@@ -0,0 +1,241 @@
+"""
+Benchmark suite of the backend hot paths on deterministic synthetic data.
+
+Stages: merge (price panel alignment), backtest (PfOptBacktest.run, mvo and
+hrp), equity (_compute_equity_curve), metrics (_compute_performance_metrics),
+bootstrap (bootstrap_backtest, 1000 paths), charts (every chart renderer) and
+e2e (/token_price, /overview and /bt against the local 1inch stand-in: cold
+store, warm caches, and warm store with the result caches cleared).
+
+    python -m backend.bench.suite --out bench.json
+    python -m backend.bench.suite --stages backtest charts --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from backend.bench.synthetic import synthetic_ohlc
+
+STAGES = ['merge', 'backtest', 'equity', 'metrics', 'bootstrap', 'charts', 'e2e']
+
+
+def _time(func, repeat: int, warmup: int = 1, setup=None) -> dict:
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        func()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(1000 * (time.perf_counter() - start))
+    samples = np.array(samples)
+    return {
+        'median_ms': float(np.median(samples)),
+        'min_ms': float(samples.min()),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'repeat': repeat,
+    }
+
+
+def _close_prices(ohlc: dict) -> pd.DataFrame:
+    return pd.DataFrame({s: df['close'].values for s, df in ohlc.items()},
+                        index=pd.Index(next(iter(ohlc.values()))['time'].values, name='time'))
+
+
+def bench_merge(ohlc: dict, repeat: int) -> list[dict]:
+    from backend.oneinch.panel import align_close_prices
+
+    # staggered histories so the join actually drops rows
+    series = {s: (df['time'].values[i % 7:], df['close'].values[i % 7:]) for i, (s, df) in enumerate(ohlc.items())}
+    return [{'stage': 'merge', 'case': 'align_close_prices', **_time(lambda: align_close_prices(series), repeat)}]
+
+
+def bench_backtest(prices: pd.DataFrame, repeat: int, lookback: int, rebalance: int) -> list[dict]:
+    from backend.backtest.pfopt import PfOptBacktest
+
+    rows = []
+    for method in ['mvo', 'hrp']:
+        for stats in ['window', 'rolling']:
+            bt = PfOptBacktest(prices, lookback, rebalance)
+            rows.append({'stage': 'backtest', 'case': f'{method}/{stats}', **_time(lambda: bt.run(method, stats), repeat)})
+    return rows
+
+
+def bench_equity_and_metrics(prices: pd.DataFrame, repeat: int, lookback: int, rebalance: int) -> list[dict]:
+    from backend.backtest.pfopt import PfOptBacktest, _compute_equity_curve, _compute_performance_metrics
+
+    weights = PfOptBacktest(prices, lookback, rebalance).get_weight_history('hrp')
+    equity = _compute_equity_curve(prices, weights)
+    time_ms = prices.index.to_list()
+    return [
+        {'stage': 'equity', 'case': '_compute_equity_curve', **_time(lambda: _compute_equity_curve(prices, weights), repeat)},
+        {'stage': 'metrics', 'case': '_compute_performance_metrics',
+         **_time(lambda: _compute_performance_metrics(equity.values, time_ms), repeat)},
+    ]
+
+
+def bench_bootstrap(prices: pd.DataFrame, repeat: int, lookback: int, rebalance: int) -> list[dict]:
+    from backend.backtest.pfopt import PfOptBacktest
+    from backend.backtest.bootstrap import bootstrap_backtest
+
+    weights = PfOptBacktest(prices, lookback, rebalance).get_weight_history('hrp')
+    return [{'stage': 'bootstrap', 'case': '1000 paths', **_time(lambda: bootstrap_backtest(prices, weights, 1000), repeat)}]
+
+
+def bench_charts(ohlc: dict, prices: pd.DataFrame, repeat: int) -> list[dict]:
+    # the draw_* functions render in-process, bypassing the chart cache and render pool
+    from backend.app import charts
+
+    first = next(iter(ohlc.values()))
+    normalized = prices / prices.iloc[0]
+    equity = normalized.mean(axis=1).values
+    sweep = pd.DataFrame([{'lookback': lb, 'rebalance': rb, 'algorithm': algo, 'Sharpe Ratio': np.sin(lb * rb)}
+                          for algo in ['mvo', 'hrp'] for lb in [30, 60, 90] for rb in [7, 30]])
+    cases = {
+        'candlestick': lambda: charts.draw_candlestick_base64(first),
+        'multiline': lambda: charts.draw_multiline_chart_base64(normalized),
+        'price_and_equity': lambda: charts.draw_price_and_equity_chart_base64(normalized, equity.tolist(), normalized.index.to_list()),
+        'sweep_heatmap': lambda: charts.draw_sweep_heatmap_base64(sweep, 'Sharpe Ratio'),
+    }
+    return [{'stage': 'charts', 'case': name, **_time(func, repeat)} for name, func in cases.items()]
+
+
+def bench_e2e(n_assets: int, n_bars: int, repeat: int, latency: float) -> list[dict]:
+    from fastapi.testclient import TestClient
+    from backend.bench.server import OneInchStandIn
+    from backend.oneinch.client import OneInchClient, set_default_client
+    from backend.oneinch.store import OHLCStore
+    from backend.oneinch.panel import PricePanelCache
+    from backend.backtest.cache import BacktestCache
+    import backend.app.main as main
+    from backend.app.charts import chart_cache
+
+    symbols = main.symbol_map_df['symbol'].head(n_assets).to_list()
+    limit = n_bars
+    urls = {
+        'token_price': f"/token_price?symbol={symbols[0]}&limit={limit}",
+        'overview': f"/overview?symbols={','.join(symbols)}&limit={limit}",
+        'bt': f"/bt?symbols={','.join(symbols)}&limit={limit}&algorithm=hrp",
+    }
+
+    def get(url):
+        response = client.get(url)
+        if isinstance(response.json(), dict) and 'error' in response.json():
+            raise RuntimeError(f"{url}: {response.json()['error']}")
+
+    def fresh_store():
+        main.ohlc_store = OHLCStore(root=tempfile.mkdtemp(dir=store_root))
+        clear_results()
+
+    def clear_results():
+        main.price_panels = PricePanelCache()
+        main.backtest_cache = BacktestCache(persist_dir=None)
+        chart_cache.clear()
+
+    rows = []
+    store_root = tempfile.mkdtemp(prefix="bench-ohlc-")
+    try:
+        with OneInchStandIn(n_bars=max(n_bars, 1500), latency=latency) as server:
+            set_default_client(OneInchClient(base_url=server.url, rate_per_second=0, max_concurrency=16))
+            client = TestClient(main.app)
+            for name, url in urls.items():
+                rows.append({'stage': 'e2e', 'case': f'{name}/cold', **_time(lambda: get(url), repeat, setup=fresh_store)})
+                rows.append({'stage': 'e2e', 'case': f'{name}/uncached', **_time(lambda: get(url), repeat, setup=clear_results)})
+                rows.append({'stage': 'e2e', 'case': f'{name}/warm', **_time(lambda: get(url), repeat)})
+    finally:
+        shutil.rmtree(store_root, ignore_errors=True)
+    return rows
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_suite(stages: list[str], n_assets: int, n_bars: int, repeat: int, lookback: int, rebalance: int,
+              latency: float, correlation: float) -> dict:
+    ohlc = synthetic_ohlc(n_assets, n_bars, correlation=correlation, end=1_700_000_000)
+    prices = _close_prices(ohlc)
+
+    results = []
+    if 'merge' in stages:
+        results += bench_merge(ohlc, repeat)
+    if 'backtest' in stages:
+        results += bench_backtest(prices, repeat, lookback, rebalance)
+    if 'equity' in stages or 'metrics' in stages:
+        results += [r for r in bench_equity_and_metrics(prices, repeat, lookback, rebalance) if r['stage'] in stages]
+    if 'bootstrap' in stages:
+        results += bench_bootstrap(prices, repeat, lookback, rebalance)
+    if 'charts' in stages:
+        results += bench_charts(ohlc, prices, repeat)
+    if 'e2e' in stages:
+        results += bench_e2e(n_assets, n_bars, repeat, latency)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': int(time.time()),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': {'assets': n_assets, 'bars': n_bars, 'repeat': repeat, 'lookback': lookback,
+                       'rebalance': rebalance, 'latency': latency, 'correlation': correlation},
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> pd.DataFrame:
+    """Median time per (stage, case) next to a baseline run; speedup > 1 is faster."""
+    now = pd.DataFrame(current['results']).set_index(['stage', 'case'])['median_ms']
+    before = pd.DataFrame(baseline['results']).set_index(['stage', 'case'])['median_ms']
+    table = pd.DataFrame({'baseline_ms': before, 'current_ms': now}).dropna()
+    table['speedup'] = table['baseline_ms'] / table['current_ms']
+    return table.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--assets', type=int, default=10)
+    parser.add_argument('--bars', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--lookback', type=int, default=90)
+    parser.add_argument('--rebalance', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.05, help='stand-in seconds per upstream response')
+    parser.add_argument('--correlation', type=float, default=0.3)
+    parser.add_argument('--out', help='write the results as JSON')
+    parser.add_argument('--compare', help='baseline JSON written by --out')
+    args = parser.parse_args()
+
+    report = run_suite(args.stages, args.assets, args.bars, args.repeat, args.lookback, args.rebalance,
+                       args.latency, args.correlation)
+    float_format = lambda x: f"{x:.4g}"
+    print(pd.DataFrame(report['results']).to_string(index=False, float_format=float_format))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        print(compare(report, baseline).to_string(index=False, float_format=float_format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+def _log_returns(rng: np.random.Generator, n_bars: int, n_assets: int, drift: float, volatility: float,
+                 correlation: float = 0.0, n_clusters: int = 1) -> np.ndarray:
+    """
+    Normal log returns with a block correlation structure: assets are split
+    into ``n_clusters`` groups, pairs in the same group have correlation
+    ``correlation`` and pairs across groups half of it.
+    """
+    if correlation == 0:
+        return rng.normal(drift, volatility, (n_bars, n_assets))
+    cluster = np.arange(n_assets) % n_clusters
+    market = rng.standard_normal((n_bars, 1))
+    sector = rng.standard_normal((n_bars, n_clusters))[:, cluster]
+    noise = rng.standard_normal((n_bars, n_assets))
+    # unit variance: corr = correlation / 2 (market) + correlation / 2 (sector)
+    shocks = (np.sqrt(correlation / 2) * market + np.sqrt(correlation / 2) * sector
+              + np.sqrt(1 - correlation) * noise)
+    return drift + volatility * shocks
+
+
+def synthetic_prices(n_assets: int = 10, n_bars: int = 1000, seed: int = 0,
+                     drift: float = 0.0003, volatility: float = 0.02,
+                     correlation: float = 0.0, n_clusters: int = 1) -> pd.DataFrame:
+    """Deterministic geometric random-walk close prices, one column per asset."""
+    rng = np.random.default_rng(seed)
+    log_returns = _log_returns(rng, n_bars, n_assets, drift, volatility, correlation, n_clusters)
+    prices = np.exp(np.cumsum(log_returns, axis=0))
+    index = pd.Index(np.arange(n_bars, dtype=np.int64) * 86_400_000, name='time')
+    return pd.DataFrame(prices, index=index, columns=[f"T{i}" for i in range(n_assets)])
+
+
+def synthetic_ohlc(n_assets: int = 10, n_bars: int = 1000, seed: int = 0,
+                   drift: float = 0.0003, volatility: float = 0.02,
+                   correlation: float = 0.3, n_clusters: int = 3,
+                   bar_seconds: int = 86400, end: int = 0) -> dict[str, pd.DataFrame]:
+    """
+    Deterministic OHLC candles per asset, shaped like ``get_cached_ohlc``
+    output: columns time (ms), open, high, low, close, oldest first, the last
+    bar starting at ``end`` (unix seconds).
+    """
+    rng = np.random.default_rng(seed)
+    log_returns = _log_returns(rng, n_bars, n_assets, drift, volatility, correlation, n_clusters)
+    close = np.exp(np.cumsum(log_returns, axis=0)) * rng.uniform(0.5, 100, n_assets)
+    open_ = np.vstack([close[:1] * np.exp(-log_returns[:1]), close[:-1]])
+    wick = np.abs(rng.normal(0, volatility / 2, (2, n_bars, n_assets)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    time = (end - bar_seconds * np.arange(n_bars - 1, -1, -1, dtype=np.int64)) * 1000
+
+    return {
+        f"T{i}": pd.DataFrame({'time': time, 'open': open_[:, i], 'high': high[:, i], 'low': low[:, i], 'close': close[:, i]})
+        for i in range(n_assets)
+    }
@@ -0,0 +1,231 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Literal, Optional
+
+import httpx
+import pandas as pd
+
+from backend import telemetry
+
+ONEINCH_API_URL = os.getenv("ONEINCH_API_URL", "https://api.1inch.dev")
+USDT_ADDRESS = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+PRICE_COLUMNS = ['time', 'open', 'high', 'low', 'close']
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Defaults match the free 1inch Dev Portal plan (1 request per second, no burst):
+# a cold N-symbol request then takes about N seconds whatever the concurrency.
+# The server enforces the quota, so bursting above it only buys 429s and
+# backoff; raise both to the plan's quota (e.g. RATE_LIMIT=10, RATE_BURST=10).
+ONEINCH_MAX_CONCURRENCY = int(os.getenv("ONEINCH_MAX_CONCURRENCY", "4"))
+ONEINCH_RATE_LIMIT = float(os.getenv("ONEINCH_RATE_LIMIT", "1"))
+ONEINCH_RATE_BURST = int(os.getenv("ONEINCH_RATE_BURST", "1"))
+
+
+def _prices_to_df(response) -> pd.DataFrame:
+    if not isinstance(response, list) or len(response) == 0:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+    df = pd.DataFrame(response)
+    df['time'] = pd.to_datetime(df['timestamp'], unit='s')
+    return df[PRICE_COLUMNS].iloc[::-1]
+
+
+def _symbols_to_df(response, chain_id: int) -> pd.DataFrame:
+    return pd.DataFrame([[info['symbol'], info['address']] for info in response if info['chainId'] == chain_id],
+                        columns=['symbol', 'address'])
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class OneInchClient:
+    """
+    Pooled async client for the 1inch REST API.
+
+    Requests share one ``httpx.AsyncClient``, run at most ``max_concurrency`` at a
+    time, go through a token-bucket rate limiter and are retried with exponential
+    backoff. Concurrent price requests for the same (chain, token, granularity)
+    are coalesced into a single upstream call.
+    """
+
+    def __init__(self,
+                 base_url: str = ONEINCH_API_URL,
+                 api_key: Optional[str] = None,
+                 max_concurrency: int = ONEINCH_MAX_CONCURRENCY,
+                 rate_per_second: float = ONEINCH_RATE_LIMIT,
+                 burst: int = ONEINCH_RATE_BURST,
+                 max_retries: int = 3,
+                 backoff: float = 0.5,
+                 timeout: float = 10.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.transport = transport
+        # created lazily so they bind to the loop that first uses the client
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+        self._inflight: dict[tuple, tuple[int, asyncio.Future]] = {}
+
+    def _ensure_started(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.rate_per_second, self.burst)
+
+    def _headers(self) -> dict:
+        api_key = self.api_key if self.api_key is not None else os.getenv('ONEINCH_API_KEY')
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None and 'Retry-After' in response.headers:
+            try:
+                return float(response.headers['Retry-After'])
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (1 + random.random() * 0.1)
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        self._ensure_started()
+        endpoint = {"endpoint": path.rsplit('/', 1)[-1]}
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self._semaphore:
+                    await self._bucket.acquire()
+                    start = time.perf_counter()
+                    response = await self._http.get(path, params=params, headers=self._headers())
+                    telemetry.observe("upstream_request_seconds", time.perf_counter() - start, endpoint)
+                if response.status_code not in RETRY_STATUS:
+                    return response.json()
+                telemetry.inc("upstream_errors_total", {**endpoint, "reason": str(response.status_code)})
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+            except httpx.TransportError as e:
+                telemetry.inc("upstream_errors_total", {**endpoint, "reason": type(e).__name__})
+                if attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    async def get_available_symbol_df(self, chain_id: int = 1) -> pd.DataFrame:
+        response = await self.get_json("/token/v1.2/multi-chain")
+        return _symbols_to_df(response, chain_id)
+
+    async def _fetch_prices(self, token_addr: str, period: str, limit: int, chain_id: int) -> pd.DataFrame:
+        params = {
+            "token0_address": token_addr,
+            "token1_address": USDT_ADDRESS,
+            "chain_id": chain_id,
+            "granularity": period,
+            "limit": limit,
+        }
+        response = await self.get_json("/portfolio/integrations/prices/v1/time_range/cross_prices", params)
+        with telemetry.stage("parse"):
+            return _prices_to_df(response)
+
+    async def get_token_historical_prices(self,
+                                          token_addr: str = "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee",
+                                          period: Literal['month', 'week', 'day', '4hour', 'hour', '15min', '5min'] = 'day',
+                                          limit: int = 1000,
+                                          chain_id: int = 1) -> pd.DataFrame:
+        key = (chain_id, token_addr.lower(), period)
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] >= limit:
+            # share the running call, it returns at least as many candles as we need
+            df = await asyncio.shield(inflight[1])
+            return df.iloc[-limit:] if limit > 0 else df
+
+        future = asyncio.ensure_future(self._fetch_prices(token_addr, period, limit, chain_id))
+        self._inflight[key] = (limit, future)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight.get(key, (None, None))[1] is future:
+                del self._inflight[key]
+
+    async def get_many_token_historical_prices(self, requests: list[tuple]) -> list[pd.DataFrame]:
+        """Fetch ``[(token_addr, period, limit, chain_id), ...]`` concurrently, results in input order."""
+        return await asyncio.gather(*(self.get_token_historical_prices(*r) for r in requests))
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class _LoopThread:
+    """Background event loop that lets sync code share one async client."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="oneinch-client", daemon=True).start()
+            return self._loop
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop()).result()
+
+
+_loop_thread = _LoopThread()
+_default_client: Optional[OneInchClient] = None
+
+
+def default_client() -> OneInchClient:
+    global _default_client
+    if _default_client is None:
+        _default_client = OneInchClient()
+    return _default_client
+
+
+def set_default_client(client: OneInchClient):
+    """Point the shared getters at another client (e.g. a local stand-in)."""
+    global _default_client
+    _default_client = client
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared client loop from synchronous code."""
+    return _loop_thread.run(coro)
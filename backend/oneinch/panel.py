@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class PricePanel:
+    """
+    Close prices of several tokens aligned on a common time index. Outer-joined
+    panels hold NaN before each token's first candle.
+    """
+    time: np.ndarray        # int64 timestamps in ms, ascending
+    symbols: list[str]
+    values: np.ndarray      # float64, shape (len(time), len(symbols))
+
+    def __len__(self):
+        return len(self.time)
+
+    def start_positions(self) -> np.ndarray:
+        """Row of every token's first price, len(time) for tokens without any."""
+        valid = ~np.isnan(self.values)
+        return np.where(valid.any(axis=0), valid.argmax(axis=0), len(self.time))
+
+    def normalized(self) -> "PricePanel":
+        if len(self.time) == 0:
+            return self
+        # divide by each token's first price, which is row 0 for inner-joined panels
+        starts = np.minimum(self.start_positions(), len(self.time) - 1)
+        first = self.values[starts, np.arange(len(self.symbols))]
+        return PricePanel(self.time, self.symbols, self.values / first)
+
+    def to_frame(self) -> pd.DataFrame:
+        # shares memory with the panel, callers must not modify it in place
+        index = pd.Index(self.time, name='time')
+        return pd.DataFrame(self.values, index=index, columns=self.symbols, copy=False)
+
+
+def align_close_prices(series: dict[str, tuple[np.ndarray, np.ndarray]], how: Literal['inner', 'outer'] = 'inner') -> PricePanel:
+    """
+    Join ``{symbol: (time, close)}`` series on time in a single pass.
+
+    ``inner`` keeps the timestamps every token has. ``outer`` keeps them all:
+    a token is NaN before its first candle and carries its last close over
+    later gaps, so young tokens do not cut the history of the others.
+
+    Every series must have unique, ascending timestamps (the OHLC store
+    guarantees this).
+    """
+    symbols = list(series.keys())
+    if not symbols:
+        return PricePanel(np.empty(0, dtype=np.int64), [], np.empty((0, 0)))
+
+    times = [np.asarray(series[s][0], dtype=np.int64) for s in symbols]
+    all_times, counts = np.unique(np.concatenate(times), return_counts=True)
+    if how == 'outer':
+        return _outer_join(series, symbols, times, all_times)
+    common = all_times[counts == len(symbols)]
+
+    values = np.empty((len(common), len(symbols)), dtype=np.float64)
+    for j, s in enumerate(symbols):
+        idx = np.searchsorted(times[j], common)
+        values[:, j] = np.asarray(series[s][1], dtype=np.float64)[idx]
+    return PricePanel(common, symbols, values)
+
+
+def _outer_join(series: dict, symbols: list[str], times: list[np.ndarray], all_times: np.ndarray) -> PricePanel:
+    values = np.full((len(all_times), len(symbols)), np.nan)
+    for j, s in enumerate(symbols):
+        values[np.searchsorted(all_times, times[j]), j] = np.asarray(series[s][1], dtype=np.float64)
+
+    # forward fill: every row points at the last row with a price, leading rows stay NaN
+    rows = np.where(~np.isnan(values), np.arange(len(all_times))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return PricePanel(all_times, symbols, values[rows, np.arange(len(symbols))])
+
+
+class PricePanelCache:
+    """LRU of aligned panels keyed by symbol set, period, limit and data version."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._panels: "OrderedDict[tuple, PricePanel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[PricePanel]:
+        with self._lock:
+            panel = self._panels.get(key)
+            if panel is not None:
+                self._panels.move_to_end(key)
+            return panel
+
+    def put(self, key: tuple, panel: PricePanel):
+        with self._lock:
+            self._panels[key] = panel
+            self._panels.move_to_end(key)
+            while len(self._panels) > self.max_entries:
+                self._panels.popitem(last=False)
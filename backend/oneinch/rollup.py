@@ -0,0 +1,107 @@
+"""
+Coarser OHLC candles built locally from finer ones: first open, max high,
+min low, last close per bucket.
+
+Buckets are aligned on UTC: fixed widths from the unix epoch, weeks starting
+on Monday and months on the first of the calendar month. Whether upstream uses
+the same alignment is checked by ``compare`` rather than assumed.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+BUCKET_MS = {
+    '5min': 5 * 60 * 1000,
+    '15min': 15 * 60 * 1000,
+    'hour': 3600 * 1000,
+    '4hour': 4 * 3600 * 1000,
+    'day': 86400 * 1000,
+    'week': 7 * 86400 * 1000,
+}
+
+# 1970-01-01 was a Thursday, Mondays are 4 days later
+WEEK_OFFSET_MS = 4 * 86400 * 1000
+
+# finer granularities a target can be rolled up from, coarsest first
+ROLLUP_SOURCES = {
+    '15min': ('5min',),
+    'hour': ('15min', '5min'),
+    '4hour': ('hour', '15min'),
+    'day': ('4hour', 'hour'),
+    'week': ('day',),
+    'month': ('day',),
+}
+
+
+@dataclass
+class Rollup:
+    data: np.ndarray      # shape (5, n), rows follow OHLC_COLUMNS, time = bucket start in ms
+    partial: np.ndarray   # shape (n,), True where source candles are missing (incl. the running bucket)
+    source: str
+
+
+def bucket_starts(times: np.ndarray, granularity: str) -> np.ndarray:
+    times = np.asarray(times).astype(np.int64)
+    if granularity == 'month':
+        return times.astype('datetime64[ms]').astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    width = BUCKET_MS[granularity]
+    offset = WEEK_OFFSET_MS if granularity == 'week' else 0
+    return (times - offset) // width * width + offset
+
+
+def bucket_ends(starts: np.ndarray, granularity: str) -> np.ndarray:
+    starts = np.asarray(starts).astype(np.int64)
+    if granularity == 'month':
+        months = starts.astype('datetime64[ms]').astype('datetime64[M]') + 1
+        return months.astype('datetime64[ms]').astype(np.int64)
+    return starts + BUCKET_MS[granularity]
+
+
+def rollup(data: np.ndarray, source: str, target: str) -> Rollup:
+    """Aggregate a time-sorted (5, n) ``source`` series into ``target`` buckets."""
+    if data.shape[1] == 0:
+        return Rollup(np.empty((5, 0), dtype=np.float64), np.empty(0, dtype=bool), source)
+
+    starts = bucket_starts(data[0], target)
+    # sorted input, so every bucket is a contiguous run of candles
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:], data.shape[1]] - 1
+
+    out = np.empty((5, len(first)), dtype=np.float64)
+    out[0] = starts[first]
+    out[1] = data[1, first]
+    out[2] = np.maximum.reduceat(data[2], first)
+    out[3] = np.minimum.reduceat(data[3], first)
+    out[4] = data[4, last]
+
+    expected = (bucket_ends(out[0], target) - out[0]) // BUCKET_MS[source]
+    partial = (last - first + 1) < expected
+    return Rollup(out, partial, source)
+
+
+def drop_leading_partial(rolled: Rollup) -> Rollup:
+    """The first bucket usually starts before the source history does; its open would be wrong."""
+    if len(rolled.partial) and rolled.partial[0]:
+        return Rollup(rolled.data[:, 1:], rolled.partial[1:], rolled.source)
+    return rolled
+
+
+def compare(rolled: Rollup, upstream: np.ndarray, target: str) -> Optional[float]:
+    """
+    Largest relative OHLC difference between complete rolled-up buckets and
+    upstream candles with the same start; inf if upstream candles are not
+    aligned like ours, None if the two share no complete bucket.
+    """
+    if upstream.shape[1] == 0:
+        return None
+    upstream_times = upstream[0].astype(np.int64)
+    if np.any(bucket_starts(upstream_times, target) != upstream_times):
+        return float('inf')
+
+    complete = rolled.data[:, ~rolled.partial]
+    _, i, j = np.intersect1d(complete[0].astype(np.int64), upstream_times, return_indices=True)
+    if len(i) == 0:
+        return None
+    ours, theirs = complete[1:, i], upstream[1:, j]
+    return float(np.max(np.abs(ours - theirs) / np.maximum(np.abs(theirs), 1e-300)))
@@ -0,0 +1,381 @@
+import os
+import math
+import json
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.oneinch.getters import get_many_token_historical_prices
+from backend.oneinch.rollup import ROLLUP_SOURCES, Rollup, rollup, drop_leading_partial, compare
+from backend import telemetry
+
+OHLC_COLUMNS = ['time', 'open', 'high', 'low', 'close']
+
+# Candle width used to plan incremental fetches. "month" uses the shortest
+# month so we never under-request bars.
+GRANULARITY_SECONDS = {
+    '5min': 5 * 60,
+    '15min': 15 * 60,
+    'hour': 3600,
+    '4hour': 4 * 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+    'month': 28 * 86400,
+}
+
+DEFAULT_STORE_DIR = os.getenv("OHLC_STORE_DIR", "backend/data/ohlc")
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("OHLC_CACHE_SIZE", "64"))
+ROLLUP_ENABLED = os.getenv("OHLC_ROLLUP", "1") != "0"
+# largest relative OHLC difference to upstream candles before a rollup pair is disabled
+ROLLUP_TOLERANCE = float(os.getenv("OHLC_ROLLUP_TOLERANCE", "1e-4"))
+# a rollup pair not compared with upstream for this long is checked against a small sample first
+ROLLUP_CHECK_INTERVAL = float(os.getenv("OHLC_ROLLUP_CHECK_INTERVAL", str(24 * 3600)))
+ROLLUP_SAMPLE_CANDLES = 8
+
+
+@dataclass
+class _Entry:
+    data: np.ndarray      # shape (5, n), rows follow OHLC_COLUMNS, time in ms
+    depth: int            # largest `limit` ever requested from upstream
+    mtime: float = 0.0    # mtime of the file this entry was loaded from
+
+
+def _df_to_columns(df: pd.DataFrame) -> np.ndarray:
+    data = np.empty((len(OHLC_COLUMNS), len(df)), dtype=np.float64)
+    time_col = df['time']
+    if np.issubdtype(time_col.dtype, np.datetime64):
+        data[0] = time_col.values.astype('datetime64[ms]').astype(np.int64)
+    else:
+        data[0] = time_col.to_numpy(dtype=np.int64)
+    for i, col in enumerate(OHLC_COLUMNS[1:], start=1):
+        data[i] = df[col].to_numpy(dtype=np.float64)
+    return data
+
+
+def _merge_columns(old: Optional[np.ndarray], new: np.ndarray) -> np.ndarray:
+    if old is None or old.shape[1] == 0:
+        merged = new
+    else:
+        merged = np.concatenate([old, new], axis=1)
+    # keep the latest copy of each candle (the newest fetch wins), sorted by time
+    reversed_time = merged[0, ::-1]
+    _, idx = np.unique(reversed_time, return_index=True)
+    idx = merged.shape[1] - 1 - idx
+    return np.ascontiguousarray(merged[:, idx])
+
+
+def _columns_to_df(data: np.ndarray) -> pd.DataFrame:
+    df = pd.DataFrame(data.T, columns=OHLC_COLUMNS)
+    df['time'] = df['time'].astype(np.int64)
+    return df
+
+
+class OHLCStore:
+    """
+    On-disk columnar OHLC store keyed by (chain, token address, granularity).
+
+    Each series is one memory-mapped ``.npy`` file of shape (5, n). Only candles
+    newer than the last stored timestamp are requested from 1inch, any ``limit``
+    is served as a slice, and at most ``max_memory_entries`` series are kept
+    mapped in memory (LRU).
+
+    ``fetcher`` takes ``[(address, granularity, limit, chain_id), ...]`` and
+    returns one DataFrame per request, so several series refresh in one batch.
+
+    With ``rollup_enabled`` a series that would need an upstream fetch is instead
+    aggregated from a finer stored series covering the requested range (after
+    an incremental refresh of that series). Rolled-up candles are not written
+    to disk. Whenever upstream candles are fetched anyway they are compared
+    with the rollup of each finer stored series; since a rollup replaces the
+    fetch, a (target, source) pair not compared for ``ROLLUP_CHECK_INTERVAL``
+    seconds (or not yet at all) first fetches ``ROLLUP_SAMPLE_CANDLES``
+    upstream candles of one token to compare with. A pair that disagrees by
+    more than ``ROLLUP_TOLERANCE`` is not used again.
+    """
+
+    def __init__(self,
+                 root: str = DEFAULT_STORE_DIR,
+                 max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 fetcher=get_many_token_historical_prices,
+                 rollup_enabled: bool = ROLLUP_ENABLED):
+        self.root = root
+        self.max_memory_entries = max_memory_entries
+        self.fetcher = fetcher
+        self.rollup_enabled = rollup_enabled
+        self._memory: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple, threading.Lock] = {}
+        self._partial_buckets: dict[tuple, np.ndarray] = {}
+        self.disabled_rollups: set[tuple[str, str]] = set()
+        self._rollups_checked: dict[tuple[str, str], float] = {}
+        self.rollups = 0
+        self.rollup_checks = 0
+        self.rollup_sample_checks = 0
+
+    @staticmethod
+    def make_key(address: str, granularity: str, chain_id: int = 1) -> tuple:
+        return (int(chain_id), address.lower(), granularity)
+
+    def _path(self, key: tuple) -> str:
+        chain_id, address, granularity = key
+        return os.path.join(self.root, str(chain_id), address, f"{granularity}.npy")
+
+    def _key_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _remember(self, key: tuple, entry: _Entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _load(self, key: tuple) -> Optional[_Entry]:
+        path = self._path(key)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry.mtime == mtime:
+                self._memory.move_to_end(key)
+                return entry
+
+        # another worker may have rewritten the file since we mapped it
+        data = np.load(path, mmap_mode='r')
+        depth = data.shape[1]
+        meta_path = path[:-len('.npy')] + '.json'
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                depth = json.load(f).get('depth', depth)
+        entry = _Entry(data=data, depth=depth, mtime=mtime)
+        self._remember(key, entry)
+        return entry
+
+    def _save(self, key: tuple, data: np.ndarray, depth: int) -> _Entry:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write-then-rename so readers never see a half written file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, data)
+        meta_path = path[:-len('.npy')] + '.json'
+        tmp_meta_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_meta_path, 'w') as f:
+            json.dump({'depth': depth}, f)
+        os.replace(tmp_meta_path, meta_path)
+        os.replace(tmp_path, path)
+
+        entry = _Entry(data=np.load(path, mmap_mode='r'), depth=depth, mtime=os.stat(path).st_mtime)
+        self._remember(key, entry)
+        return entry
+
+    @staticmethod
+    def plan_fetch(entry: Optional[_Entry], granularity: str, limit: int, now: Optional[float] = None) -> int:
+        """Number of candles to request from upstream, 0 when the stored series is fresh."""
+        if entry is None or limit > entry.depth or entry.data.shape[1] == 0:
+            return limit
+
+        now = time.time() if now is None else now
+        step = GRANULARITY_SECONDS[granularity]
+        elapsed = now - entry.data[0, -1] / 1000
+        if elapsed < step:
+            return 0
+        # +1 re-fetches the last stored candle, which may have been incomplete
+        return min(limit, math.ceil(elapsed / step) + 1)
+
+    def update(self, key: tuple, df: pd.DataFrame, limit: int) -> Optional[_Entry]:
+        """Merge freshly fetched candles into the stored series."""
+        entry = self._load(key)
+        old = None if entry is None else np.asarray(entry.data)
+        depth = max(limit, 0 if entry is None else entry.depth)
+        if len(df) == 0:
+            return entry
+        return self._save(key, _merge_columns(old, _df_to_columns(df)), depth)
+
+    def _rollup_many(self, keys: list[tuple], target: str, limit: int) -> dict[tuple, Rollup]:
+        """Rollups of ``limit`` complete-history buckets for the keys a finer stored series covers."""
+        now_ms = time.time() * 1000
+        rolled = {}
+        for source in ROLLUP_SOURCES.get(target, ()):
+            pending = [k for k in keys if k not in rolled]
+            if not pending or (target, source) in self.disabled_rollups:
+                continue
+            sources = {}
+            for k in pending:
+                source_key = (k[0], k[1], source)
+                entry = self._load(source_key)
+                # cheap pre-check; the bucket count after refreshing decides
+                if entry is not None and entry.data.shape[1] and \
+                        now_ms - entry.data[0, 0] >= limit * GRANULARITY_SECONDS[target] * 1000:
+                    sources[k] = source_key
+            if not sources:
+                continue
+
+            source_keys = sorted(set(sources.values()))
+            locks = [self._key_lock(k) for k in source_keys]
+            for lock in locks:
+                lock.acquire()
+            try:
+                entries = {k: self._load(k) for k in source_keys}
+                plans = [(k, self.plan_fetch(entries[k], source, entries[k].depth)) for k in source_keys]
+                stale = {k for k, n in plans if n > 0}
+                # only incremental refreshes: re-downloading a whole finer series costs more than it saves
+                plans = [(k, n) for k, n in plans if 0 < n < entries[k].depth]
+                if plans:
+                    dfs = self.fetcher([(k[1], source, n, k[0]) for k, n in plans])
+                    for (k, _), df in zip(plans, dfs):
+                        if len(df):
+                            entries[k] = self.update(k, df, entries[k].depth)
+                            stale.discard(k)
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+
+            for k, source_key in sources.items():
+                if source_key in stale:
+                    continue
+                result = drop_leading_partial(rollup(np.asarray(entries[source_key].data), source, target))
+                if result.data.shape[1] >= limit:
+                    rolled[k] = result
+        return rolled
+
+    def _record_check(self, target: str, source: str, deviation: Optional[float]) -> bool:
+        """Count one rollup comparison, disabling the pair on a mismatch; False if it was disabled."""
+        if deviation is None:
+            return True
+        with self._lock:
+            self.rollup_checks += 1
+            self._rollups_checked[(target, source)] = time.time()
+            if deviation <= ROLLUP_TOLERANCE:
+                return True
+            self.disabled_rollups.add((target, source))
+        telemetry.inc("ohlc_rollup_mismatches_total", {"target": target, "source": source})
+        return False
+
+    def _check_rollups(self, entries: dict[tuple, Optional[_Entry]], target: str):
+        """Compare freshly fetched upstream candles with the rollups of the finer stored series."""
+        for source in ROLLUP_SOURCES.get(target, ()):
+            if (target, source) in self.disabled_rollups:
+                continue
+            for k, entry in entries.items():
+                source_entry = self._load((k[0], k[1], source))
+                if entry is None or source_entry is None:
+                    continue
+                # the newest upstream candle may still be running
+                deviation = compare(rollup(np.asarray(source_entry.data), source, target), entry.data[:, :-1], target)
+                if not self._record_check(target, source, deviation):
+                    break
+
+    def _sample_check_rollups(self, rolled: dict[tuple, Rollup], target: str) -> dict[tuple, Rollup]:
+        """
+        Compare one rollup per (target, source) pair due for a check with a
+        small upstream sample; rollups of pairs that fail are dropped.
+        """
+        now = time.time()
+        for source in sorted({result.source for result in rolled.values()}):
+            with self._lock:
+                due = now - self._rollups_checked.get((target, source), -math.inf) >= ROLLUP_CHECK_INTERVAL
+                if due:
+                    # inconclusive samples are retried after the interval too, not on every call
+                    self._rollups_checked[(target, source)] = now
+            if not due:
+                continue
+            k = next(k for k, result in rolled.items() if result.source == source)
+            df = self.fetcher([(k[1], target, ROLLUP_SAMPLE_CANDLES, k[0])])[0]
+            with self._lock:
+                self.rollup_sample_checks += 1
+            # the newest upstream candle may still be running
+            self._record_check(target, source, compare(rolled[k], _df_to_columns(df)[:, :-1], target))
+        return {k: result for k, result in rolled.items() if (target, result.source) not in self.disabled_rollups}
+
+    def partial_buckets(self, address: str, granularity: str, chain_id: int = 1) -> np.ndarray:
+        """Start times (ms) of rolled-up candles with missing source candles, empty for upstream series."""
+        return self._partial_buckets.get(self.make_key(address, granularity, chain_id), np.empty(0, dtype=np.int64))
+
+    def stats(self) -> dict:
+        return {
+            'memory_entries': len(self._memory),
+            'rollups': self.rollups,
+            'rollup_checks': self.rollup_checks,
+            'rollup_sample_checks': self.rollup_sample_checks,
+            'disabled_rollups': sorted(self.disabled_rollups),
+        }
+
+    def get_many_columns(self,
+                         addresses: list[str],
+                         granularity: Literal['month', 'week', 'day', '4hour', 'hour', '15min', '5min'] = 'day',
+                         limit: int = 1000,
+                         chain_id: int = 1) -> list[np.ndarray]:
+        """Last ``limit`` candles of each token as read-only (5, n) views, rows follow OHLC_COLUMNS."""
+        keys = [self.make_key(a, granularity, chain_id) for a in addresses]
+        unique_keys = sorted(set(keys))
+        # lock in sorted order so overlapping batches cannot deadlock
+        locks = [self._key_lock(k) for k in unique_keys]
+        for lock in locks:
+            lock.acquire()
+        try:
+            entries = {k: self._load(k) for k in unique_keys}
+            plans = [(k, self.plan_fetch(entries[k], granularity, limit)) for k in unique_keys]
+            for _, n in plans:
+                telemetry.cache_result("ohlc_store", n == 0)
+            plans = [(k, n) for k, n in plans if n > 0]
+
+            rolled = self._rollup_many([k for k, _ in plans], granularity, limit) if self.rollup_enabled and plans else {}
+            if rolled:
+                rolled = self._sample_check_rollups(rolled, granularity)
+            for k, result in rolled.items():
+                telemetry.inc("ohlc_rollups_total", {"target": granularity, "source": result.source})
+                with self._lock:
+                    self.rollups += 1
+                    self._partial_buckets[k] = result.data[0, -limit:][result.partial[-limit:]].astype(np.int64)
+            plans = [(k, n) for k, n in plans if k not in rolled]
+
+            if plans:
+                dfs = self.fetcher([(k[1], granularity, n, chain_id) for k, n in plans])
+                for (k, _), df in zip(plans, dfs):
+                    entries[k] = self.update(k, df, limit) or entries[k]
+                    self._partial_buckets.pop(k, None)
+                if self.rollup_enabled:
+                    self._check_rollups({k: entries[k] for k, _ in plans}, granularity)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        columns = []
+        for k in keys:
+            entry = entries[k]
+            if k in rolled:
+                columns.append(rolled[k].data[:, -limit:])
+            elif entry is None:
+                columns.append(np.empty((len(OHLC_COLUMNS), 0), dtype=np.float64))
+            else:
+                columns.append(entry.data[:, -limit:])
+        return columns
+
+    def get_columns(self,
+                    address: str,
+                    granularity: Literal['month', 'week', 'day', '4hour', 'hour', '15min', '5min'] = 'day',
+                    limit: int = 1000,
+                    chain_id: int = 1) -> np.ndarray:
+        return self.get_many_columns([address], granularity, limit, chain_id)[0]
+
+    def get(self,
+            address: str,
+            granularity: Literal['month', 'week', 'day', '4hour', 'hour', '15min', '5min'] = 'day',
+            limit: int = 1000,
+            chain_id: int = 1) -> pd.DataFrame:
+        return _columns_to_df(self.get_columns(address, granularity, limit, chain_id))
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
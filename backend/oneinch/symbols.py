@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import math
+import difflib
+import bisect
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+
+SYMBOL_CSV = "backend/oneinch/available_symbol.csv"
+TOKEN_LISTS = ("ethMainnet.json", "polygon.json")
+SYMBOL_TOP_K = int(os.getenv("SYMBOL_TOP_K", "20"))
+# every query word is fuzzy-matched against the whole table, long messages only use their first words
+SYMBOL_QUERY_WORDS = int(os.getenv("SYMBOL_QUERY_WORDS", "64"))
+
+CHAIN_NAMES = {1: "ethereum", 137: "polygon"}
+
+# query words that select a tag or a chain rather than a token name
+TAG_KEYWORDS = {
+    "stablecoin": "PEG:USD", "stablecoins": "PEG:USD", "stable": "PEG:USD", "usd": "PEG:USD", "dollar": "PEG:USD",
+    "btc": "PEG:BTC", "bitcoin": "PEG:BTC",
+    "eth": "PEG:ETH", "ether": "PEG:ETH", "ethereum": "PEG:ETH",
+    "eur": "PEG:EUR", "euro": "PEG:EUR",
+    "staking": "staking", "staked": "staking",
+    "savings": "savings", "yield": "savings",
+}
+CHAIN_KEYWORDS = {"ethereum": 1, "mainnet": 1, "polygon": 137, "matic": 137}
+
+# lowercase English words that happen to be token symbols; they only match exactly when written in caps
+STOPWORDS = {
+    "a", "about", "add", "all", "an", "and", "any", "are", "as", "at", "backtest", "be", "best", "build", "but", "buy",
+    "by", "can", "coin", "coins", "compare", "do", "does", "for", "from", "fun", "get", "give", "good", "have", "hello",
+    "hi", "how", "i", "if", "in", "into", "is", "it", "last", "like", "me", "more", "my", "new", "no", "not", "of",
+    "on", "one", "or", "over", "pool", "portfolio", "sell", "should", "show", "some", "start", "that", "the", "there",
+    "this", "to", "token", "tokens", "up", "use", "vs", "want", "what", "where", "which", "with", "would", "year",
+    "you", "your",
+}
+
+_WORD_RE = re.compile(r"[A-Za-z0-9$.+\-]+")
+
+
+def _words(text: str) -> list[str]:
+    return [w.strip(".-") for w in _WORD_RE.findall(text) if w.strip(".-")]
+
+
+@dataclass
+class SymbolInfo:
+    symbol: str
+    address: str
+    name: str = ""
+    tags: list[str] = field(default_factory=list)
+    chains: list[int] = field(default_factory=lambda: [1])
+
+    def describe(self) -> str:
+        chains = ", ".join(CHAIN_NAMES.get(c, str(c)) for c in self.chains)
+        tags = [t for t in self.tags if t != "tokens"]
+        text = f"{self.symbol}: {self.name or self.symbol} ({chains})"
+        return f"{text} [{', '.join(tags)}]" if tags else text
+
+
+class SymbolIndex:
+    """
+    In-memory search over the backtestable symbols, enriched with the 1inch
+    token lists (names, tags, chains).
+
+    A query is split into words and every word is matched four ways, best
+    first: exact symbol, symbol prefix, keyword (name words weighted by
+    rarity, tags and chains) and fuzzy symbol/name similarity. ``search``
+    returns the top-k symbols by summed score.
+    """
+
+    def __init__(self, infos: list[SymbolInfo]):
+        self.infos = infos
+        self._by_symbol: dict[str, list[int]] = defaultdict(list)
+        self._by_word: dict[str, set[int]] = defaultdict(set)
+        self._by_tag: dict[str, set[int]] = defaultdict(set)
+        self._by_chain: dict[int, set[int]] = defaultdict(set)
+
+        for i, info in enumerate(infos):
+            self._by_symbol[info.symbol.upper()].append(i)
+            for word in _words(info.name):
+                self._by_word[word.lower()].add(i)
+            for tag in info.tags:
+                self._by_tag[tag].add(i)
+            for chain in info.chains:
+                self._by_chain[chain].add(i)
+
+        self._sorted_symbols = sorted(self._by_symbol)
+        self._names = {info.name.lower(): i for i, info in enumerate(infos) if info.name}
+        self._idf = {w: math.log(1 + len(infos) / len(ids)) for w, ids in self._by_word.items()}
+
+    @classmethod
+    def from_files(cls, symbol_csv: str = SYMBOL_CSV, token_lists=TOKEN_LISTS, symbol_df: Optional[pd.DataFrame] = None):
+        if symbol_df is None:
+            symbol_df = pd.read_csv(symbol_csv)
+
+        by_address, by_symbol = {}, defaultdict(list)
+        for path in token_lists:
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                for token in json.load(f).get("tokens", []):
+                    by_address[(token["chainId"], token["address"].lower())] = token
+                    by_symbol[token["symbol"].upper()].append(token)
+
+        infos = []
+        for symbol, address in zip(symbol_df["symbol"], symbol_df["address"]):
+            info = SymbolInfo(symbol=symbol, address=address)
+            token = by_address.get((1, address.lower()))
+            if token is not None:
+                info.name = token.get("name", "")
+                info.tags = list(token.get("tags", []))
+            # the same symbol on other chains (bridged tokens)
+            for other in by_symbol.get(symbol.upper(), []):
+                if other["chainId"] not in info.chains:
+                    info.chains.append(other["chainId"])
+                    info.tags += [t for t in other.get("tags", []) if t not in info.tags]
+                    info.name = info.name or other.get("name", "")
+            infos.append(info)
+        return cls(infos)
+
+    def _score_word(self, word: str, scores: defaultdict):
+        upper, lower = word.upper(), word.lower()
+
+        # exact: common words only count when written as a ticker
+        if lower not in STOPWORDS or word == upper:
+            for i in self._by_symbol.get(upper, []):
+                scores[i] += 100
+
+        # prefix
+        if len(word) >= 2 and lower not in STOPWORDS:
+            start = bisect.bisect_left(self._sorted_symbols, upper)
+            for symbol in self._sorted_symbols[start:]:
+                if not symbol.startswith(upper):
+                    break
+                if symbol != upper:
+                    for i in self._by_symbol[symbol]:
+                        scores[i] += 40 * len(upper) / len(symbol)
+
+        if lower in STOPWORDS:
+            return
+
+        # keyword: token names, tags and chains
+        for i in self._by_word.get(lower, ()):
+            scores[i] += 10 * self._idf[lower]
+        tag = TAG_KEYWORDS.get(lower)
+        if tag is not None:
+            for i in self._by_tag.get(tag, ()):
+                scores[i] += 20
+        chain = CHAIN_KEYWORDS.get(lower)
+        if chain is not None and chain != 1:
+            for i in self._by_chain.get(chain, ()):
+                scores[i] += 10
+
+        # fuzzy: typos in tickers and names
+        if (len(word) >= 3 and upper not in self._by_symbol and lower not in self._by_word
+                and tag is None and chain is None):
+            for symbol in difflib.get_close_matches(upper, self._sorted_symbols, n=3, cutoff=0.75):
+                for i in self._by_symbol[symbol]:
+                    scores[i] += 30 * difflib.SequenceMatcher(None, upper, symbol).ratio()
+            for name in difflib.get_close_matches(lower, list(self._names), n=3, cutoff=0.8):
+                scores[self._names[name]] += 25
+
+    def search(self, query: str, k: int = SYMBOL_TOP_K) -> list[SymbolInfo]:
+        scores = defaultdict(float)
+        for word in _words(query)[:SYMBOL_QUERY_WORDS]:
+            self._score_word(word, scores)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.infos[item[0]].symbol))
+        return [self.infos[i] for i, _ in ranked[:k]]
+
+    def context(self, query: str, k: int = SYMBOL_TOP_K) -> str:
+        """Prompt context for ``query``: the top-k matches, one per line."""
+        matches = self.search(query, k)
+        header = f"Available tokens for backtesting ({len(self.infos)} in total), most relevant to the question:"
+        if not matches:
+            return f"{header}\n(no token matched; ask the user which tokens they have in mind)"
+        return "\n".join([header] + [info.describe() for info in matches])
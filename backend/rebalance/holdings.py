@@ -0,0 +1,68 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Optional
+
+import numpy as np
+
+from backend.rebalance.strategies import StrategyConfig
+
+# {strategy address: {symbol: units}} for MockHoldingsSource until a chain source exists
+MOCK_HOLDINGS_PATH = os.getenv("MOCK_HOLDINGS_PATH") or None
+
+
+class HoldingsSource:
+    """Current token balances (token units, not raw integers) of a strategy's user."""
+
+    def balances(self, config: StrategyConfig) -> dict[str, float]:
+        raise NotImplementedError
+
+    def balances_many(self, configs: list[StrategyConfig]) -> dict[str, dict[str, float]]:
+        # sources that can batch (e.g. one multicall per block) override this
+        return {config.address: self.balances(config) for config in configs}
+
+
+class MockHoldingsSource(HoldingsSource):
+    """
+    In-memory balances keyed by strategy address, standing in for the chain.
+
+    ``apply`` executes rebalance instructions against the balances at given
+    prices, so a planning round can be checked end to end. Strategies without
+    balances get ``seed``-random holdings of their symbols when ``seed`` is set.
+    """
+
+    def __init__(self, balances: Optional[dict[str, dict[str, float]]] = None, seed: Optional[int] = None):
+        self._balances = {address.lower(): dict(b) for address, b in (balances or {}).items()}
+        self.seed = seed
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, seed: Optional[int] = None) -> "MockHoldingsSource":
+        with open(path) as f:
+            return cls(json.load(f), seed)
+
+    def set_balances(self, address: str, balances: dict[str, float]):
+        with self._lock:
+            self._balances[address.lower()] = dict(balances)
+
+    def balances(self, config: StrategyConfig) -> dict[str, float]:
+        with self._lock:
+            if config.address not in self._balances and self.seed is not None:
+                # addresses come from user input, hash rather than parse them
+                digest = hashlib.blake2b(config.address.encode(), digest_size=8).digest()
+                rng = np.random.default_rng([self.seed, int.from_bytes(digest, 'big')])
+                self._balances[config.address] = {s: float(rng.uniform(0, 100)) for s in config.symbols}
+            return dict(self._balances.get(config.address, {}))
+
+    def apply(self, address: str, instructions: list, prices: dict[str, float]):
+        """Execute instructions as the owner account would, swaps filled at ``prices``."""
+        with self._lock:
+            balances = self._balances.setdefault(address.lower(), {})
+            for instruction in instructions:
+                if instruction.action == "swap":
+                    balances[instruction.token] = balances.get(instruction.token, 0.0) - instruction.amount
+                    bought = instruction.amount * prices[instruction.token] / prices[instruction.to_token]
+                    balances[instruction.to_token] = balances.get(instruction.to_token, 0.0) + bought
+            for token in [t for t, amount in balances.items() if abs(amount) < 1e-12]:
+                del balances[token]
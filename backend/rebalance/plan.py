@@ -0,0 +1,98 @@
+"""
+Turn target weights and current holdings into Strategy contract calls.
+
+The owner account pulls every token to sell into the contract once
+(``transferFrom``), swaps, and sends every bought token back to the user once
+(``transfer``). Sells and buys are matched largest first, which needs at most
+(sells + buys - 1) swaps.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+# trades smaller than this (in quote currency) are not worth their gas
+MIN_TRADE_VALUE = float(os.getenv("REBALANCE_MIN_TRADE_VALUE", "10"))
+# no rebalance until some weight is this far from its target
+DRIFT_TOLERANCE = float(os.getenv("REBALANCE_DRIFT_TOLERANCE", "0.02"))
+
+
+@dataclass
+class Instruction:
+    action: Literal["transferFrom", "swap", "transfer"]
+    token: str                      # token moved, or sold for swaps
+    amount: float                   # units of ``token``
+    to_token: Optional[str] = None  # token bought by a swap
+    value: float = 0.0              # at the planning prices
+
+
+@dataclass
+class RebalancePlan:
+    address: str
+    total_value: float
+    drift: float
+    weights: dict[str, float]
+    targets: dict[str, float]
+    instructions: list[Instruction] = field(default_factory=list)
+    unpriced: list[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def plan_rebalance(address: str,
+                   holdings: dict[str, float],
+                   prices: dict[str, float],
+                   targets: dict[str, float],
+                   min_trade_value: float = MIN_TRADE_VALUE,
+                   drift_tolerance: float = DRIFT_TOLERANCE) -> RebalancePlan:
+    """
+    Instructions moving ``holdings`` (token units) to ``targets`` (weights
+    summing to 1). Held tokens without a price are left alone and listed in
+    ``unpriced``; held tokens missing from ``targets`` are sold only if
+    ``prices`` has them, which RebalanceService's prices (the strategy's
+    symbols) never do, so there they end up in ``unpriced`` too.
+    """
+    tokens = sorted(set(targets) | {t for t, amount in holdings.items() if amount > 0})
+    unpriced = [t for t in tokens if not prices.get(t)]
+    tokens = [t for t in tokens if prices.get(t)]
+    values = {t: holdings.get(t, 0.0) * prices[t] for t in tokens}
+    total = sum(values.values())
+    if total <= 0:
+        return RebalancePlan(address, 0.0, 0.0, {}, dict(targets), unpriced=unpriced)
+
+    weights = {t: v / total for t, v in values.items()}
+    drift = max(abs(weights[t] - targets.get(t, 0.0)) for t in tokens)
+    plan = RebalancePlan(address, total, drift, weights, dict(targets), unpriced=unpriced)
+    if drift < drift_tolerance:
+        return plan
+
+    deltas = {t: targets.get(t, 0.0) * total - values[t] for t in tokens}
+    sells = sorted(((-d, t) for t, d in deltas.items() if -d >= min_trade_value), reverse=True)
+    buys = sorted(((d, t) for t, d in deltas.items() if d >= min_trade_value), reverse=True)
+
+    swaps = []
+    i = j = 0
+    sell_left = [v for v, _ in sells]
+    buy_left = [v for v, _ in buys]
+    while i < len(sells) and j < len(buys):
+        value = min(sell_left[i], buy_left[j])
+        swaps.append((sells[i][1], buys[j][1], value))
+        sell_left[i] -= value
+        buy_left[j] -= value
+        if sell_left[i] <= 1e-9 * total:
+            i += 1
+        if buy_left[j] <= 1e-9 * total:
+            j += 1
+
+    sold: dict[str, float] = {}
+    bought: dict[str, float] = {}
+    for token, to_token, value in swaps:
+        sold[token] = sold.get(token, 0.0) + value
+        bought[to_token] = bought.get(to_token, 0.0) + value
+
+    def units(token: str, value: float) -> float:
+        # never more than is held, whatever the float rounding
+        return min(value / prices[token], holdings.get(token, 0.0))
+
+    plan.instructions += [Instruction("transferFrom", t, units(t, v), value=v) for t, v in sold.items()]
+    plan.instructions += [Instruction("swap", t, units(t, v), to_token, v) for t, to_token, v in swaps]
+    plan.instructions += [Instruction("transfer", t, v / prices[t], value=v) for t, v in bought.items()]
+    return plan
@@ -0,0 +1,148 @@
+"""
+Live target weights for every registered Strategy contract.
+
+Each round loads the latest candles once per period for the union of all
+registered symbols, solves one optimization per distinct (symbols, period,
+lookback, algorithm) group over its latest lookback window only, and fans the
+weights out to the group's strategies, where they are diffed against current
+holdings. The optimization cost grows with the number of distinct
+configurations, not with the number of users.
+"""
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from backend.oneinch.store import OHLCStore
+from backend.oneinch.panel import align_close_prices
+from backend.rebalance.strategies import StrategyRegistry
+from backend.rebalance.holdings import HoldingsSource
+from backend.rebalance.plan import DRIFT_TOLERANCE, MIN_TRADE_VALUE, RebalancePlan, plan_rebalance
+from backend import telemetry
+
+REBALANCE_INTERVAL = float(os.getenv("REBALANCE_INTERVAL", "0"))   # seconds, 0 = only on demand
+
+
+@dataclass
+class TargetWeights:
+    weights: dict[str, float]
+    prices: dict[str, float]     # latest close of every symbol of the group
+    time: int                    # ms, last bar of the window
+
+
+class RebalanceService:
+
+    def __init__(self,
+                 registry: StrategyRegistry,
+                 store: OHLCStore,
+                 holdings: HoldingsSource,
+                 resolve_address: Callable[[str], str],
+                 min_trade_value: float = MIN_TRADE_VALUE,
+                 drift_tolerance: float = DRIFT_TOLERANCE):
+        self.registry = registry
+        self.store = store
+        self.holdings = holdings
+        self.resolve_address = resolve_address
+        self.min_trade_value = min_trade_value
+        self.drift_tolerance = drift_tolerance
+        self.plans: dict[str, RebalancePlan] = {}
+        self.last_round: dict = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _latest_closes(self, groups: list[tuple]) -> dict[str, dict[str, tuple]]:
+        # one store read per period for the union of symbols, deep enough for the longest lookback
+        series = {}
+        for period in {period for _, period, _, _ in groups}:
+            period_groups = [g for g in groups if g[1] == period]
+            symbols = sorted({s for g in period_groups for s in g[0]})
+            limit = max(lookback for _, _, lookback, _ in period_groups) + 1
+            addresses = [self.resolve_address(s) for s in symbols]
+            columns = self.store.get_many_columns(addresses, period, limit)
+            series[period] = {s: (c[0], c[4]) for s, c in zip(symbols, columns)}
+        return series
+
+    @staticmethod
+    def _solve(group: tuple, series: dict[str, tuple]) -> TargetWeights:
+        from backend.backtest.pfopt import PfOptBacktest, _clip_and_normalize
+
+        symbols, _, lookback, algorithm = group
+        panel = align_close_prices({s: series[s] for s in symbols})
+        if len(panel) < lookback:
+            raise ValueError(f"{len(panel)} common bars, lookback needs {lookback}")
+        # the window PfOptBacktest would use at a rebalance on the next bar
+        window = panel.to_frame().iloc[-lookback:]
+        # normalized as /bt does: HRP clusters the price covariance, which depends on each token's price level
+        window = window / window.iloc[0]
+        weights = _clip_and_normalize(PfOptBacktest._get_weight(window, algorithm).to_frame().T).iloc[0]
+        prices = dict(zip(panel.symbols, panel.values[-1].tolist()))
+        return TargetWeights(weights.to_dict(), prices, int(panel.time[-1]))
+
+    @telemetry.timed("rebalance_targets")
+    def compute_targets(self, groups: list[tuple]) -> dict[tuple, TargetWeights | Exception]:
+        series = self._latest_closes(groups)
+        targets = {}
+        for group in groups:
+            try:
+                targets[group] = self._solve(group, series[group[1]])
+            except Exception as e:
+                targets[group] = e
+        telemetry.inc("rebalance_optimizations_total", value=len(groups))
+        return targets
+
+    def run_once(self) -> dict[str, RebalancePlan]:
+        """One planning round over every registered strategy."""
+        start = time.perf_counter()
+        groups = self.registry.groups()
+        targets = self.compute_targets(list(groups))
+        holdings = self.holdings.balances_many([c for configs in groups.values() for c in configs])
+
+        plans = {}
+        for group, configs in groups.items():
+            target = targets[group]
+            for config in configs:
+                if isinstance(target, Exception):
+                    plans[config.address] = RebalancePlan(config.address, 0.0, 0.0, {}, {}, error=str(target))
+                    continue
+                plans[config.address] = plan_rebalance(config.address, holdings.get(config.address, {}), target.prices,
+                                                       target.weights, self.min_trade_value, self.drift_tolerance)
+
+        with self._lock:
+            self.plans = plans
+            self.last_round = {
+                "time": time.time(),
+                "seconds": time.perf_counter() - start,
+                "strategies": len(plans),
+                "optimizations": len(groups),
+                "failed_optimizations": sum(isinstance(t, Exception) for t in targets.values()),
+                "rebalancing": sum(bool(p.instructions) for p in plans.values()),
+                "instructions": sum(len(p.instructions) for p in plans.values()),
+            }
+        return plans
+
+    def plan(self, address: str) -> Optional[RebalancePlan]:
+        with self._lock:
+            return self.plans.get(address.lower())
+
+    def _loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                with self._lock:
+                    self.last_round = {"time": time.time(), "error": str(e)}
+
+    def start(self, interval: float = REBALANCE_INTERVAL) -> "RebalanceService":
+        if interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, args=(interval,), name="rebalance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"registered": len(self.registry), **self.last_round}
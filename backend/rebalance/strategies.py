@@ -0,0 +1,87 @@
+import os
+import json
+import threading
+from dataclasses import asdict, dataclass
+from typing import Literal, Optional
+
+STRATEGY_REGISTRY_PATH = os.getenv("STRATEGY_REGISTRY_PATH") or None   # e.g. backend/data/strategies.json
+
+
+@dataclass
+class StrategyConfig:
+    """
+    One deployed Strategy contract and the allocation its owner account
+    maintains. Symbols resolve through available_symbol.csv, so strategies
+    live on Ethereum mainnet like the candles the targets are computed from.
+    """
+    address: str                 # Strategy contract
+    user: str                    # the user's EOA holding the assets
+    symbols: tuple[str, ...]
+    period: Literal["month", "week", "day", "4hour", "hour", "15min", "5min"] = "day"
+    lookback: int = 90
+    algorithm: Literal["mvo", "hrp"] = "mvo"
+
+    def __post_init__(self):
+        self.address = self.address.lower()
+        self.user = self.user.lower()
+        # symbol order does not change the optimization, keep one canonical order
+        self.symbols = tuple(sorted(dict.fromkeys(self.symbols)))
+
+    def group_key(self) -> tuple:
+        """Strategies with the same key share one optimization."""
+        return (self.symbols, self.period, int(self.lookback), self.algorithm)
+
+
+class StrategyRegistry:
+    """Registered strategies by contract address, optionally kept in a JSON file."""
+
+    def __init__(self, path: Optional[str] = STRATEGY_REGISTRY_PATH):
+        self.path = path
+        self._strategies: dict[str, StrategyConfig] = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                for item in json.load(f):
+                    item["symbols"] = tuple(item["symbols"])
+                    config = StrategyConfig(**item)
+                    self._strategies[config.address] = config
+
+    def _write(self):
+        # called with self._lock held; write-then-rename like the OHLC store
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([asdict(c) for c in self._strategies.values()], f)
+        os.replace(tmp_path, self.path)
+
+    def register(self, config: StrategyConfig) -> StrategyConfig:
+        with self._lock:
+            self._strategies[config.address] = config
+            self._write()
+        return config
+
+    def remove(self, address: str) -> Optional[StrategyConfig]:
+        with self._lock:
+            config = self._strategies.pop(address.lower(), None)
+            if config is not None:
+                self._write()
+            return config
+
+    def get(self, address: str) -> Optional[StrategyConfig]:
+        with self._lock:
+            return self._strategies.get(address.lower())
+
+    def all(self) -> list[StrategyConfig]:
+        with self._lock:
+            return list(self._strategies.values())
+
+    def groups(self) -> dict[tuple, list[StrategyConfig]]:
+        groups: dict[tuple, list[StrategyConfig]] = {}
+        for config in self.all():
+            groups.setdefault(config.group_key(), []).append(config)
+        return groups
+
+    def __len__(self):
+        return len(self._strategies)
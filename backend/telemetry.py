@@ -0,0 +1,206 @@
+"""
+In-process telemetry: per-stage timings, counters and histograms, rendered in
+the Prometheus text format, plus per-request stage totals for ``Server-Timing``.
+
+Everything is a no-op with TELEMETRY=0: ``stage`` returns a shared null
+context, ``timed`` returns the function unchanged and ``inc``/``observe``
+return immediately. Numbers recorded in worker processes (parallel window
+solving, the render pool) stay in those processes.
+"""
+import os
+import time
+import bisect
+import threading
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY", "1") != "0"
+METRIC_PREFIX = "backend_"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "stage_seconds": "Time spent per processing stage.",
+    "http_request_seconds": "HTTP request duration per route.",
+    "upstream_request_seconds": "1inch API call duration per endpoint.",
+    "upstream_errors_total": "1inch API failures per endpoint and reason (retried or not).",
+    "cache_requests_total": "Cache lookups per cache and result.",
+    "optimizer_windows_total": "Rebalance windows solved per method.",
+    "optimizer_fallbacks_total": "MVO windows that fell back from max_sharpe to min_volatility.",
+}
+
+
+def _labels_key(labels: Optional[dict]) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class Registry:
+    """Counters and histograms keyed by (name, labels); ``collectors`` add gauges at scrape time."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters: dict[tuple, float] = {}
+        self._histograms: dict[tuple, _Histogram] = {}
+        self._collectors: list[Callable[[], Iterable[tuple]]] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Optional[dict] = None, value: float = 1.0):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None):
+        key = (name, _labels_key(labels))
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            if i < len(self.buckets):
+                histogram.counts[i] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]):
+        """``collector()`` yields ``(name, labels, value)`` gauges, read on every scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+
+        lines = []
+        seen = set()
+
+        def header(name: str, kind: str):
+            if name not in seen:
+                seen.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {METRIC_PREFIX}{name} {HELP[name]}")
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {total:g}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                header(name, "gauge")
+                lines.append(f"{METRIC_PREFIX}{name}{_format_labels(_labels_key(labels))} {float(value):g}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# stage -> seconds for the request being served, None outside a request
+_request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        registry.observe("stage_seconds", seconds, {"stage": self.name})
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + seconds
+        return False
+
+
+_NO_STAGE = nullcontext()
+
+
+def stage(name: str):
+    """``with stage("merge"): ...`` records the block duration."""
+    return _Stage(name) if TELEMETRY_ENABLED else _NO_STAGE
+
+
+def timed(name: str):
+    """Decorator form of ``stage``; leaves the function untouched when telemetry is off."""
+
+    def decorator(func):
+        if not TELEMETRY_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inc(name: str, labels: Optional[dict] = None, value: float = 1.0):
+    if TELEMETRY_ENABLED:
+        registry.inc(name, labels, value)
+
+
+def observe(name: str, value: float, labels: Optional[dict] = None):
+    if TELEMETRY_ENABLED:
+        registry.observe(name, value, labels)
+
+
+def cache_result(cache: str, hit: bool):
+    if TELEMETRY_ENABLED:
+        registry.inc("cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"})
+
+
+def begin_request() -> tuple:
+    timings = {}
+    return timings, _request_timings.set(timings)
+
+
+def end_request(token) -> None:
+    _request_timings.reset(token)
+
+
+def server_timing(timings: dict) -> str:
+    """``Server-Timing`` header value, durations in ms."""
+    return ", ".join(f"{name};dur={1000 * seconds:.1f}" for name, seconds in timings.items())
+
+
+def render_metrics() -> str:
+    return registry.render()
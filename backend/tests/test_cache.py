@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from backend.app import main
+from backend.backtest.cache import BacktestCache
+from backend.backtest.pfopt import PfOptBacktest, _compute_equity_curve
+from backend.bench.synthetic import synthetic_prices
+
+LOOKBACK = 60
+REBALANCE = 7
+
+
+@pytest.fixture(scope='module')
+def prices() -> pd.DataFrame:
+    return synthetic_prices(5, 360, seed=3, correlation=0.3)
+
+
+@pytest.fixture
+def cache(monkeypatch) -> BacktestCache:
+    cache = BacktestCache(persist_dir=None)
+    monkeypatch.setattr(main, "backtest_cache", cache)
+    return cache
+
+
+def _normalized(prices: pd.DataFrame, start: int, end: int) -> pd.DataFrame:
+    # the panel /bt backtests: prices over [start, end), divided by the first row
+    window = prices.iloc[start:end]
+    return window / window.iloc[0]
+
+
+def _backtest(price_df: pd.DataFrame, method: str, stats: str):
+    return main.get_backtest_result("A,B,C,D,E", "day", price_df, LOOKBACK, REBALANCE, method, stats)
+
+
+def _assert_full_recompute(result, price_df: pd.DataFrame, method: str, stats: str):
+    weights = PfOptBacktest(price_df, LOOKBACK, REBALANCE).get_weight_history(method, stats)
+    pd.testing.assert_frame_equal(result.weight_history, weights, check_exact=False, atol=1e-15, rtol=0)
+    # the extended curve multiplies the cached last value into the tail, one rounding per bar
+    pd.testing.assert_series_equal(result.equity_curve, _compute_equity_curve(price_df, weights),
+                                   check_exact=False, atol=0, rtol=1e-13)
+
+
+@pytest.mark.parametrize('method', ['mvo', 'hrp'])
+@pytest.mark.parametrize('stats', ['window', 'rolling'])
+def test_extension_matches_full_recompute(prices, cache, method, stats):
+    _backtest(_normalized(prices, 0, 250), method, stats)
+    for end in (251, 300, len(prices)):  # one bar, several bars, up to new rebalance dates
+        price_df = _normalized(prices, 0, end)
+        result = _backtest(price_df, method, stats)
+        _assert_full_recompute(result, price_df, method, stats)
+    assert cache.stats()['extensions'] == 3
+
+
+@pytest.mark.parametrize('method', ['mvo', 'hrp'])
+def test_moved_start_recomputes(prices, cache, method):
+    _backtest(_normalized(prices, 0, 250), method, 'window')
+    # a sliding limit window drops the first bars and renormalizes, the cached prefix is gone
+    price_df = _normalized(prices, 10, 260)
+    result = _backtest(price_df, method, 'window')
+    _assert_full_recompute(result, price_df, method, 'window')
+    assert cache.stats() == {'entries': 2, 'hits': 0, 'misses': 2, 'extensions': 0}
@@ -0,0 +1,91 @@
+import json
+import time
+import threading
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+
+import backend.app.main as main
+
+ANSWER = "MVO maximizes the Sharpe ratio, HRP spreads risk across clusters."
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    def use_fake_llm(sleep: float):
+        monkeypatch.setattr(main, "build_llm", lambda: FakeListChatModel(responses=[ANSWER], sleep=sleep))
+        monkeypatch.setattr(main, "_conversation_chain", None)
+
+    monkeypatch.setattr(main, "_sessions", None)
+    use_fake_llm(0.0)
+    with TestClient(main.app) as client:
+        client.use_fake_llm = use_fake_llm
+        yield client
+
+
+def _events(lines) -> list[tuple[str, dict]]:
+    events, event = [], "message"
+    for line in lines:
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            events.append((event, json.loads(line[len("data:"):])))
+            event = "message"
+    return events
+
+
+def test_chat_keeps_the_session(client):
+    first = client.post("/chat", params={"user_input": "hi"}).json()
+    assert first["answer"] == ANSWER
+    second = client.post("/chat", params={"user_input": "and HRP?", "session_id": first["session_id"]}).json()
+    assert second["session_id"] == first["session_id"]
+    assert len(main.get_session_history(first["session_id"]).messages) == 4
+
+
+def test_chat_stream_sends_chunks_then_the_full_answer(client):
+    with client.stream("POST", "/chat_stream", params={"user_input": "compare MVO and HRP"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _events(response.iter_lines())
+
+    chunks = [data["answer"] for event, data in events if event == "message"]
+    assert len(chunks) > 1
+    assert "".join(chunks) == ANSWER
+    assert events[-1][0] == "end"
+    assert events[-1][1]["answer"] == ANSWER
+    assert events[-1][1]["session_id"] == response.headers["x-session-id"]
+
+
+@pytest.mark.parametrize('slow', ['model', 'retrieval'])
+def test_slow_chat_does_not_block_other_requests(client, monkeypatch, slow):
+    if slow == 'model':
+        # ~2.6 s of streaming, one character every 40 ms
+        client.use_fake_llm(0.04)
+    else:
+        def relevant_symbols(user_input):
+            time.sleep(2.5)
+            return []
+        monkeypatch.setattr(main, "relevant_symbols", relevant_symbols)
+    candles = pd.DataFrame({"time": pd.date_range("2025-01-01", periods=30, freq="D"),
+                            "open": 1.0, "high": 1.1, "low": 0.9, "close": 1.0})
+    monkeypatch.setattr(main, "get_cached_ohlc", lambda symbol, period, limit: candles)
+    symbol = main.symbol_map_df["symbol"].iloc[0]
+    client.get("/token_price", params={"symbol": symbol, "limit": 30})   # loads matplotlib
+
+    # TestClient hands the body over once the response is complete, so wait for the model to be mid-answer
+    answers = []
+    thread = threading.Thread(target=lambda: answers.append(client.post("/chat_stream", params={"user_input": "hi"}).text))
+    thread.start()
+    time.sleep(0.5)
+
+    start = time.perf_counter()
+    response = client.get("/token_price", params={"symbol": symbol, "limit": 30})
+    elapsed = time.perf_counter() - start
+    still_streaming = thread.is_alive()
+    thread.join()
+
+    assert response.json().startswith("data:image/png;base64,")
+    assert still_streaming
+    assert elapsed < 1.0
+    assert "event: end" in answers[0]
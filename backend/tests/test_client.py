@@ -0,0 +1,88 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from backend.bench.server import OneInchStandIn
+from backend.oneinch.client import OneInchClient
+
+ETH = "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee"
+
+
+@pytest.fixture
+def stand_in():
+    with OneInchStandIn(n_bars=200) as srv:
+        yield srv
+
+
+class _Failing(httpx.AsyncBaseTransport):
+    """Answers the first ``len(statuses)`` requests with those statuses, then forwards to the stand-in."""
+
+    def __init__(self, statuses: list[int]):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self._transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        if self.statuses:
+            return httpx.Response(self.statuses.pop(0), headers={"Retry-After": "0"}, request=request)
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _run(client: OneInchClient, coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_concurrent_identical_requests_hit_upstream_once(stand_in):
+    stand_in.latency = 0.2
+    client = OneInchClient(base_url=stand_in.url, rate_per_second=0)
+    requests = [(ETH, 'day', 100, 1)] * 5 + [(ETH, 'day', 10, 1)]
+    dfs = _run(client, client.get_many_token_historical_prices(requests))
+
+    assert stand_in.requests == 1
+    assert [len(df) for df in dfs] == [100] * 5 + [10]
+    # the shorter request gets the newest candles of the shared call
+    assert dfs[-1]['time'].tolist() == dfs[0]['time'].iloc[-10:].tolist()
+
+
+@pytest.mark.parametrize('statuses', [[429], [503, 502], [429, 500, 504]])
+def test_failures_are_retried(stand_in, statuses):
+    transport = _Failing(statuses)
+    client = OneInchClient(base_url=stand_in.url, rate_per_second=0, max_retries=3, transport=transport)
+    df = _run(client, client.get_token_historical_prices(ETH, 'day', 50))
+
+    assert len(df) == 50
+    assert transport.calls == len(statuses) + 1
+    assert stand_in.requests == 1
+
+
+def test_failures_beyond_max_retries_raise(stand_in):
+    transport = _Failing([503] * 3)
+    client = OneInchClient(base_url=stand_in.url, rate_per_second=0, max_retries=2, transport=transport)
+    with pytest.raises(httpx.HTTPStatusError):
+        _run(client, client.get_token_historical_prices(ETH, 'day', 50))
+    assert transport.calls == 3
+    assert stand_in.requests == 0
+
+
+def test_request_rate_is_bounded(stand_in):
+    rate, n = 10, 8
+    client = OneInchClient(base_url=stand_in.url, rate_per_second=rate, burst=1, max_concurrency=8)
+    addresses = stand_in.tokens['address'][:n]
+    start = time.perf_counter()
+    dfs = _run(client, client.get_many_token_historical_prices([(addr, 'day', 20, 1) for addr in addresses]))
+    elapsed = time.perf_counter() - start
+
+    assert stand_in.requests == n and all(len(df) == 20 for df in dfs)
+    # one token up front, then one every 1 / rate seconds
+    assert elapsed >= (n - 1) / rate
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.backtest.metrics import PerformanceAccumulator, compute_batch_metrics, compute_performance_metrics
+
+DAY_MS = 86_400_000
+
+
+def _baseline(equity: np.ndarray, time: np.ndarray) -> dict:
+    # the metrics as _compute_performance_metrics defined them before the accumulator, written out with pandas
+    equity = pd.Series(equity, index=pd.to_datetime(time, unit='ms'))
+    log_returns = np.log(equity).diff().dropna()
+    years_per_bar = (equity.index[-1] - equity.index[0]).total_seconds() / len(log_returns) / (365 * 24 * 3600)
+    peak = equity.cummax()
+    drawdown = equity / peak - 1
+
+    # a drawdown lasts from the last high to every point below it
+    high_time = pd.Series(equity.index.where(equity >= peak), index=equity.index).ffill()
+    durations = (equity.index - high_time)[equity < peak]
+
+    pnl = equity.diff().dropna()
+    gross_loss = -pnl[pnl < 0].sum()
+    return {
+        'Total Return': equity.iloc[-1] / equity.iloc[0] - 1,
+        'Sharpe Ratio': log_returns.mean() / log_returns.std(ddof=1) / np.sqrt(years_per_bar),
+        'Max Drawdown': drawdown.min(),
+        'Max Drawdown Duration (day)': durations.max().total_seconds() / 86400 if len(durations) else 0.0,
+        'Profit Factor': pnl[pnl > 0].sum() / gross_loss if gross_loss != 0 else np.inf,
+    }
+
+
+def _curve(kind: str, n: int = 500):
+    rng = np.random.default_rng(7)
+    # irregular bar spacing: 1 to 3 days
+    time = 1_600_000_000_000 + np.cumsum(rng.integers(1, 4, n)) * DAY_MS
+    if kind == 'random':
+        equity = np.exp(np.cumsum(rng.normal(0.0005, 0.02, n)))
+    elif kind == 'rising':
+        equity = np.exp(np.cumsum(rng.uniform(0.001, 0.01, n)))
+    else:
+        # a crash in the middle, never fully recovered
+        equity = np.exp(np.cumsum(np.where(np.arange(n) < n // 2, 0.002, -0.001) + rng.normal(0, 0.005, n)))
+    return equity, time.astype(np.float64)
+
+
+def _assert_metrics_close(actual: dict, expected: dict):
+    assert actual.keys() == expected.keys()
+    for name, value in expected.items():
+        np.testing.assert_allclose(actual[name], value, rtol=1e-9, atol=1e-12, err_msg=name)
+
+
+@pytest.mark.parametrize('kind', ['random', 'rising', 'crash'])
+def test_whole_curve_matches_baseline(kind):
+    equity, time = _curve(kind)
+    _assert_metrics_close(compute_performance_metrics(equity, time), _baseline(equity, time))
+
+
+@pytest.mark.parametrize('kind', ['random', 'rising', 'crash'])
+@pytest.mark.parametrize('chunk', [1, 7, 64, 499])
+def test_chunked_updates_match_baseline(kind, chunk):
+    equity, time = _curve(kind)
+    acc = PerformanceAccumulator()
+    for start in range(0, len(equity), chunk):
+        acc.update_many(equity[start:start + chunk], time[start:start + chunk])
+        if start == 0:
+            continue
+        # readable at any moment, for the prefix seen so far
+        end = min(start + chunk, len(equity))
+        _assert_metrics_close(acc.metrics(), _baseline(equity[:end], time[:end]))
+
+
+def test_batch_metrics_match_baseline():
+    curves = [_curve(kind) for kind in ('random', 'rising', 'crash')]
+    time = curves[0][1]
+    batch = compute_batch_metrics(np.stack([equity for equity, _ in curves]), time)
+    for k, (equity, _) in enumerate(curves):
+        expected = _baseline(equity, time)
+        for name, values in batch.items():
+            np.testing.assert_allclose(values[k], expected[name], rtol=1e-9, atol=1e-12, err_msg=name)
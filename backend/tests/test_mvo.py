@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pypfopt import EfficientFrontier, expected_returns, risk_models
+from pypfopt.exceptions import OptimizationError
+
+from backend.backtest.mvo import MVOEngine
+from backend.backtest.pfopt import PfOptBacktest
+from backend.bench.synthetic import synthetic_prices
+
+
+def _moments(prices: pd.DataFrame, lookback: int, rebalance: int):
+    for i in range(lookback, len(prices), rebalance):
+        window = prices.iloc[i - lookback:i]
+        yield expected_returns.mean_historical_return(window).values, risk_models.sample_cov(window).values
+
+
+def test_engine_weights_do_not_depend_on_solve_history():
+    moments = list(_moments(synthetic_prices(20, 600, correlation=0.3), 90, 25))
+    fresh = [MVOEngine(20).weights(mu, cov) for mu, cov in moments]
+    engine = MVOEngine(20)
+    in_order = [engine.weights(mu, cov) for mu, cov in moments]
+    reversed_order = [engine.weights(mu, cov) for mu, cov in moments[::-1]][::-1]
+    np.testing.assert_array_equal(np.array(in_order), np.array(fresh))
+    np.testing.assert_array_equal(np.array(reversed_order), np.array(fresh))
+
+
+
+def _efficient_frontier_weights(mu: pd.Series, cov: pd.DataFrame) -> tuple[pd.Series, bool]:
+    # the per-window EfficientFrontier solve the engine replaced, (weights, fell back)
+    try:
+        ef = EfficientFrontier(mu, cov, weight_bounds=(0, 1))
+        ef.max_sharpe()
+    except OptimizationError:
+        # OSQP sometimes stops at its iteration limit from a cold start, where the engine's
+        # formulation converges; compare with the max-Sharpe point a converging solver finds
+        ef = EfficientFrontier(mu, cov, weight_bounds=(0, 1), solver='CLARABEL')
+        ef.max_sharpe()
+    except ValueError:
+        # no asset beats the risk-free rate
+        ef = EfficientFrontier(mu, cov, weight_bounds=(0, 1))
+        ef.min_volatility()
+        return pd.Series(ef.clean_weights()), True
+    return pd.Series(ef.clean_weights()), False
+
+
+@pytest.mark.parametrize('n_assets, seed, drift, has_fallbacks', [
+    (5, 0, 0.0003, False),
+    (10, 1, 0.0003, False),
+    (20, 2, 0.001, False),
+    (8, 3, -0.003, True),      # mostly falling prices: windows without excess return
+    (6, 4, 0.0, False),
+])
+def test_weights_match_efficient_frontier(n_assets, seed, drift, has_fallbacks):
+    prices = synthetic_prices(n_assets, 400, seed, drift=drift, correlation=0.3)
+    fell_back = []
+    for i in range(90, len(prices), 30):
+        window = prices.iloc[i - 90:i]
+        expected, fallback = _efficient_frontier_weights(expected_returns.mean_historical_return(window),
+                                                         risk_models.sample_cov(window))
+        fell_back.append(fallback)
+        # clean_weights() rounds to 5 decimals
+        np.testing.assert_allclose(PfOptBacktest._get_weight(window, 'mvo').values, expected.values, atol=2e-5)
+    if has_fallbacks:
+        assert any(fell_back)
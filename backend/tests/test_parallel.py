@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+from pypfopt import HRPOpt, expected_returns, risk_models
+
+from backend.backtest.mvo import MVOEngine
+from backend.backtest.pfopt import PfOptBacktest, _clip_and_normalize
+from backend.bench.synthetic import synthetic_prices
+
+LOOKBACK = 90
+REBALANCE = 10
+
+
+@pytest.fixture(scope='module')
+def prices() -> pd.DataFrame:
+    return synthetic_prices(6, 400, correlation=0.3)
+
+
+def _reference(prices: pd.DataFrame, method: str) -> pd.DataFrame:
+    # every window solved from scratch: a new engine for MVO, pypfopt itself for HRP
+    points = range(LOOKBACK, len(prices), REBALANCE)
+    weights = []
+    for i in points:
+        window = prices.iloc[i - LOOKBACK:i]
+        if method == 'mvo':
+            mu = expected_returns.mean_historical_return(window)
+            cov = risk_models.sample_cov(window)
+            weights.append(pd.Series(MVOEngine(len(mu)).weights(mu.values, cov.values), index=prices.columns))
+        else:
+            weights.append(pd.Series(HRPOpt(window).optimize()))
+    index = [prices.index[i] for i in points]
+    return _clip_and_normalize(pd.DataFrame(weights, index=index, columns=prices.columns))
+
+
+@pytest.mark.parametrize('method', ['mvo', 'hrp'])
+@pytest.mark.parametrize('stats', ['window', 'rolling'])
+@pytest.mark.parametrize('workers', [1, 3])
+def test_weight_history_matches_fresh_solves(prices, method, stats, workers):
+    weights = PfOptBacktest(prices, LOOKBACK, REBALANCE, workers=workers).get_weight_history(method, stats)
+    # rolling moments differ from per-window ones only by float rounding
+    pd.testing.assert_frame_equal(weights, _reference(prices, method), check_exact=False, atol=1e-8, rtol=0)
+
+
+def test_serial_and_pooled_weights_are_identical(prices):
+    serial = PfOptBacktest(prices, LOOKBACK, REBALANCE).get_weight_history('mvo')
+    pooled = PfOptBacktest(prices, LOOKBACK, REBALANCE, workers=3).get_weight_history('mvo')
+    pd.testing.assert_frame_equal(serial, pooled, check_exact=True)
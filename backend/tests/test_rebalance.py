@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.backtest.pfopt import PfOptBacktest
+from backend.bench.synthetic import synthetic_prices
+from backend.rebalance.holdings import MockHoldingsSource
+from backend.rebalance.service import RebalanceService
+from backend.rebalance.strategies import StrategyConfig, StrategyRegistry
+
+LOOKBACK = 60
+# very different price levels, as for WETH, a stablecoin, a meme token and WBTC
+SCALES = [3000, 1, 0.001, 60000]
+
+
+class _Store:
+    """get_many_columns over fixed close prices keyed by address."""
+
+    def __init__(self, prices: pd.DataFrame):
+        self.prices = prices
+
+    def get_many_columns(self, addresses, period='day', limit=1000, chain_id=1):
+        columns = []
+        for address in addresses:
+            close = self.prices[address].values[-limit:]
+            time = self.prices.index.values[-limit:].astype(np.float64)
+            columns.append(np.vstack([time, close, close, close, close]))
+        return columns
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    return synthetic_prices(4, 300, correlation=0.3) * SCALES
+
+
+@pytest.mark.parametrize('algorithm', ['mvo', 'hrp'])
+def test_targets_match_backtest_on_normalized_window(prices, algorithm):
+    symbols = tuple(prices.columns)
+    service = RebalanceService(StrategyRegistry(None), _Store(prices), MockHoldingsSource(seed=0), lambda s: s)
+    config = service.registry.register(StrategyConfig("0x" + "1" * 40, "0x" + "2" * 40, symbols, 'day', LOOKBACK, algorithm))
+    target = service.compute_targets([config.group_key()])[config.group_key()]
+
+    # the last LOOKBACK bars are the window PfOptBacktest solves at a rebalance on the next bar
+    window = prices.iloc[-LOOKBACK:]
+    normalized = pd.concat([window, window.iloc[-1:]]) / window.iloc[0]
+    normalized.index = range(len(normalized))
+    expected = PfOptBacktest(normalized, LOOKBACK, 1).get_weight_history(algorithm).iloc[-1]
+    np.testing.assert_allclose(pd.Series(target.weights)[list(symbols)].values, expected[list(symbols)].values, atol=1e-8)
+    if algorithm == 'hrp':
+        # HRP always spreads the weight, all of it on one token means a scale-dependent covariance
+        assert max(target.weights.values()) < 0.9
+
+
+def test_plans_move_holdings_to_targets(prices):
+    holdings = MockHoldingsSource(seed=1)
+    service = RebalanceService(StrategyRegistry(None), _Store(prices), holdings, lambda s: s)
+    for i in range(6):
+        service.registry.register(StrategyConfig(f"0x{i:040x}", f"0x{i + 100:040x}", tuple(prices.columns), 'day', LOOKBACK, 'hrp'))
+
+    plans = service.run_once()
+    assert service.last_round['optimizations'] == 1
+    prices_now = dict(zip(prices.columns, prices.iloc[-1]))
+    for address, plan in plans.items():
+        holdings.apply(address, plan.instructions, prices_now)
+    assert all(plan.drift < service.drift_tolerance for plan in service.run_once().values())
+
+
+def test_mock_holdings_for_any_address(prices):
+    config = StrategyConfig("my-strategy.eth", "0x" + "3" * 40, tuple(prices.columns))
+    balances = MockHoldingsSource(seed=2).balances(config)
+    assert balances == MockHoldingsSource(seed=2).balances(config)
+    assert sorted(balances) == sorted(prices.columns)
+
+
+def test_held_tokens_outside_the_group_are_unpriced(prices):
+    address = "0x" + "4" * 40
+    holdings = MockHoldingsSource({address: {prices.columns[0]: 1.0, "OTHER": 5.0}})
+    service = RebalanceService(StrategyRegistry(None), _Store(prices), holdings, lambda s: s)
+    service.registry.register(StrategyConfig(address, "0x" + "5" * 40, tuple(prices.columns), 'day', LOOKBACK, 'hrp'))
+
+    plan = service.run_once()[address]
+    assert plan.unpriced == ["OTHER"]
+    assert all("OTHER" not in (i.token, i.to_token) for i in plan.instructions)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.bench.synthetic import synthetic_ohlc
+from backend.oneinch.rollup import bucket_starts, compare, drop_leading_partial, rollup
+
+HOUR = 3600
+DAY = 86400
+# a UTC midnight, Monday 2024-01-01
+MIDNIGHT = 1_704_067_200
+MISSING = 24 * 4 + 13   # one hour candle of the fifth full day is missing
+
+
+def _hours() -> pd.DataFrame:
+    # 3 hours before the first midnight, 20 full days, then 6 hours of the running day
+    n_bars = 3 + 20 * 24 + 6
+    return synthetic_ohlc(1, n_bars, seed=5, bar_seconds=HOUR, end=MIDNIGHT + 20 * DAY + 5 * HOUR)["T0"]
+
+
+def _days(hours: pd.DataFrame) -> pd.DataFrame:
+    # day candles built directly from hour candles with pandas, and how many hours each one has
+    grouped = hours.set_index(pd.to_datetime(hours['time'], unit='ms')).resample('1D')
+    days = grouped.agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
+    days['count'] = grouped.size()
+    days.insert(0, 'time', days.index.astype('datetime64[ms]').astype(np.int64))
+    return days.reset_index(drop=True)
+
+
+def _array(df: pd.DataFrame) -> np.ndarray:
+    return df[['time', 'open', 'high', 'low', 'close']].to_numpy(dtype=np.float64).T
+
+
+@pytest.fixture(scope='module')
+def hours() -> pd.DataFrame:
+    return _hours().drop(index=3 + MISSING).reset_index(drop=True)
+
+
+def test_hours_roll_up_to_day_candles(hours):
+    rolled = rollup(_array(hours), 'hour', 'day')
+    days = _days(hours)
+
+    np.testing.assert_array_equal(rolled.data, _array(days))
+    # leading bucket without its first hours, the one with a missing candle, the running day
+    np.testing.assert_array_equal(rolled.partial, days['count'] < 24)
+    assert np.flatnonzero(rolled.partial).tolist() == [0, 5, 21]
+    assert rolled.source == 'hour'
+
+
+def test_drop_leading_partial(hours):
+    rolled = drop_leading_partial(rollup(_array(hours), 'hour', 'day'))
+    assert rolled.data[0, 0] == MIDNIGHT * 1000
+    assert np.flatnonzero(rolled.partial).tolist() == [4, 20]
+    # nothing more to drop
+    again = drop_leading_partial(rolled)
+    np.testing.assert_array_equal(again.data, rolled.data)
+
+
+def test_compare_skips_partial_buckets(hours):
+    rolled = rollup(_array(hours), 'hour', 'day')
+    # upstream has every hour, so the bucket missing one differs from it, but only in a partial bucket
+    upstream = _array(_days(_hours()))
+    assert compare(rolled, upstream, 'day') == 0.0
+
+    tampered = upstream.copy()
+    tampered[4, 10] *= 1.01
+    assert compare(rolled, tampered, 'day') == pytest.approx(0.01 / 1.01)
+
+    assert compare(rolled, upstream + np.array([[HOUR * 1000], [0], [0], [0], [0]]), 'day') == float('inf')
+    assert compare(rolled, upstream[:, :1], 'day') is None
+    assert compare(rolled, upstream[:, :0], 'day') is None
+
+
+def test_bucket_alignment():
+    times = np.array([MIDNIGHT - 1, MIDNIGHT, MIDNIGHT + 3 * DAY + 5 * HOUR, MIDNIGHT + 40 * DAY]) * 1000
+    # weeks start on Monday (MIDNIGHT is one), months on the first of the month
+    np.testing.assert_array_equal(bucket_starts(times, 'week') // 1000,
+                                  [MIDNIGHT - 7 * DAY, MIDNIGHT, MIDNIGHT, MIDNIGHT + 35 * DAY])
+    np.testing.assert_array_equal(bucket_starts(times, 'month') // 1000,
+                                  [MIDNIGHT - 31 * DAY, MIDNIGHT, MIDNIGHT, MIDNIGHT + 31 * DAY])
+    np.testing.assert_array_equal(bucket_starts(times, '4hour') // 1000,
+                                  [MIDNIGHT - 4 * HOUR, MIDNIGHT, MIDNIGHT + 3 * DAY + 4 * HOUR, MIDNIGHT + 40 * DAY])
+
+
+def test_month_buckets_count_calendar_days():
+    # February 2024 has 29 days, a complete month of day candles is not partial
+    start = MIDNIGHT + 31 * DAY
+    days = synthetic_ohlc(1, 29 + 31, seed=1, bar_seconds=DAY, end=start + 59 * DAY)["T0"]
+    rolled = rollup(_array(days), 'day', 'month')
+    assert (rolled.data[0] // 1000).tolist() == [start, start + 29 * DAY]
+    assert rolled.partial.tolist() == [False, False]
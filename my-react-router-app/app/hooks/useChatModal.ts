@@ -1,6 +1,6 @@
 // app/hooks/useChatModal.ts
 
-import { useState, useCallback } from "react";
+import { useState, useCallback, useRef } from "react";
 
 export interface Message {
   role: "user" | "assistant";
@@ -12,6 +12,8 @@ export function useChatModal() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [newMessage, setNewMessage] = useState<string>("");
   const [isLoading, setIsLoading] = useState<boolean>(false);
+  // the backend starts a new conversation for requests without a session id
+  const sessionId = useRef<string | null>(null);
 
   const openChat = useCallback(() => {
     setIsChatOpen(true);
@@ -40,7 +42,8 @@ export function useChatModal() {
 
     try {
       // Replace this with your actual API call
-      const response = await fetch("http://127.0.0.1:8000/chat?user_input="+ newMessage, {
+      const session = sessionId.current ? "&session_id=" + encodeURIComponent(sessionId.current) : "";
+      const response = await fetch("http://127.0.0.1:8000/chat?user_input="+ newMessage + session, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -48,6 +51,9 @@ export function useChatModal() {
         body: JSON.stringify({ user_input: newMessage }),
       });
       const data = await response.json();
+      if (data.session_id) {
+        sessionId.current = data.session_id;
+      }
       const assistantMessage: Message = { role: 'assistant', content: data.answer };
       setMessages((prevMessages) => [...prevMessages, assistantMessage]);
 